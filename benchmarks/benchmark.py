@@ -0,0 +1,246 @@
+"""
+Load benchmark for the jlrincontrol integration
+
+Drives JLRApiHandler connect, update and service paths against the local
+mock InControl api for fleets of simulated vehicles and reports wall time,
+executor jobs and dispatcher fan-out for each.
+
+Requires homeassistant and jlrpy to be installed. Run from the repository
+root with:
+    python -m benchmarks.benchmark --vehicles 1 10 100 --latency 0.1
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import jlrpy
+from homeassistant.const import CONF_PASSWORD, CONF_PIN, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant import bootstrap, config_entries, loader
+from homeassistant.helpers.entity_component import EntityComponent
+from homeassistant.util.unit_system import METRIC_SYSTEM
+
+import custom_components.jlrincontrol as jlrincontrol
+from custom_components.jlrincontrol import device_tracker, lock, sensor
+from custom_components.jlrincontrol.const import (
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_USE_CHINA_SERVERS,
+    DOMAIN,
+    JLR_DATA,
+    JLR_SERVICES,
+)
+
+from .mock_incontrol import MockInControl, async_start_server
+
+
+class BenchmarkStats:
+    """Counts executor jobs and dispatcher signals during a phase"""
+
+    def __init__(self, hass):
+        self.executor_jobs = 0
+        self.signals = Counter()
+        self.listener_calls = 0
+
+        add_executor_job = hass.async_add_executor_job
+        dispatcher_send = jlrincontrol.async_dispatcher_send
+
+        def counting_add_executor_job(target, *args):
+            self.executor_jobs += 1
+            return add_executor_job(target, *args)
+
+        def counting_dispatcher_send(hass, signal, *args):
+            self.signals[signal] += 1
+            self.listener_calls += len(
+                hass.data.get("dispatcher", {}).get(signal, {})
+            )
+            return dispatcher_send(hass, signal, *args)
+
+        hass.async_add_executor_job = counting_add_executor_job
+        jlrincontrol.async_dispatcher_send = counting_dispatcher_send
+
+    def reset(self):
+        self.executor_jobs = 0
+        self.signals.clear()
+        self.listener_calls = 0
+
+
+async def async_create_hass(config_dir):
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    hass.config.units = METRIC_SYSTEM
+    # Registries and entity helpers needed to add entities
+    if hasattr(loader, "async_setup"):
+        loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    await hass.async_start()
+    return hass
+
+
+async def async_add_entities(hass, config_entry):
+    """Create the entities of each platform so signals reach listeners"""
+    count = 0
+    for module in [sensor, lock, device_tracker]:
+        platform = module.__name__.rsplit(".", 1)[1]
+        added = []
+        await module.async_setup_entry(
+            hass,
+            config_entry,
+            lambda entities, update=False: added.append((entities, update)),
+        )
+        component = EntityComponent(logging.getLogger(__name__), platform, hass)
+        for entities, update in added:
+            await component.async_add_entities(entities, update)
+            count += len(entities)
+    return count
+
+
+def patch_base_urls(base_url):
+    jlrpy.BaseURLs.IFAS = f"{base_url}/ifas/jlr"
+    jlrpy.BaseURLs.IFOP = f"{base_url}/ifop/jlr"
+    jlrpy.BaseURLs.IF9 = f"{base_url}/if9/jlr"
+
+
+async def async_time_phase(results, name, stats, mock, coro):
+    stats.reset()
+    mock.requests.clear()
+    start = time.perf_counter()
+    await coro
+    results.append(
+        {
+            "phase": name,
+            "wall": time.perf_counter() - start,
+            "api": sum(mock.requests.values()),
+            "executor": stats.executor_jobs,
+            "signals": sum(stats.signals.values()),
+            "listeners": stats.listener_calls,
+        }
+    )
+
+
+async def async_run_fleet(vehicles, args):
+    mock = MockInControl(
+        vehicles=vehicles,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        service_duration=args.service_duration,
+        seed=1,
+    )
+    runner, base_url = await async_start_server(mock)
+    patch_base_urls(base_url)
+
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir)
+        stats = BenchmarkStats(hass)
+
+        config_entry = SimpleNamespace(
+            entry_id=f"benchmark{vehicles}",
+            data={
+                CONF_USERNAME: "bench@example.com",
+                CONF_PASSWORD: "password",
+                CONF_USE_CHINA_SERVERS: False,
+            },
+            options={
+                CONF_PIN: "1234",
+                CONF_MAX_CONCURRENT_REQUESTS: args.max_concurrent,
+            },
+        )
+        data = jlrincontrol.JLRApiHandler(hass, config_entry)
+        hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = {
+            JLR_DATA: data
+        }
+
+        await async_time_phase(
+            results, "connect", stats, mock, data.async_connect()
+        )
+        await async_time_phase(
+            results, "first update", stats, mock, data.async_update()
+        )
+        entities = await async_add_entities(hass, config_entry)
+        for cycle in range(args.cycles):
+            mock.tick()
+            await async_time_phase(
+                results, f"update {cycle + 1}", stats, mock, data.async_update()
+            )
+
+        vin = next(iter(data.vehicles))
+        service = JLR_SERVICES["lock_vehicle"]
+        await async_time_phase(
+            results,
+            "lock service",
+            stats,
+            mock,
+            data.async_queue_service(
+                vin,
+                service_name=service["function_name"],
+                service_code=service["service_code"],
+                pin="1234",
+            ),
+        )
+        await async_time_phase(
+            results, "health update", stats, mock, data.async_health_update()
+        )
+
+        data.async_stop()
+        await hass.async_stop(force=True)
+
+    # Service phases only measure the real flow if every command was
+    # sent with a token from the service auth step
+    if mock.auth_failures:
+        await runner.cleanup()
+        raise RuntimeError(
+            "{} service commands failed authentication".format(
+                mock.auth_failures
+            )
+        )
+
+    await runner.cleanup()
+    return entities, results
+
+
+def print_results(vehicles, entities, results):
+    print(f"\n{vehicles} vehicle(s), {entities} entities")
+    print(
+        "{:<16}{:>10}{:>8}{:>10}{:>10}{:>11}".format(
+            "phase", "wall (s)", "api", "executor", "signals", "listeners"
+        )
+    )
+    for result in results:
+        print(
+            "{phase:<16}{wall:>10.3f}{api:>8}{executor:>10}{signals:>10}"
+            "{listeners:>11}".format(**result)
+        )
+
+
+async def async_main(args):
+    for vehicles in args.vehicles:
+        print_results(vehicles, *await async_run_fleet(vehicles, args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--service-duration", type=float, default=1.0)
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+    asyncio.run(async_main(args))
+
+
+if __name__ == "__main__":
+    main()
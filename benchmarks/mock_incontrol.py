@@ -0,0 +1,411 @@
+"""
+Local mock of the JLR InControl api
+
+Serves the endpoints used by the jlrincontrol integration for a fleet of
+simulated vehicles, with configurable latency and error injection.
+
+Run standalone with:
+    python -m benchmarks.mock_incontrol --vehicles 10 --latency 0.2
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+SERVICE_COMMANDS = {
+    "lock": "RDL",
+    "unlock": "RDU",
+    "honkBlink": "HBLF",
+    "healthstatus": "VHS",
+    "engineOn": "REON",
+    "engineOff": "REOFF",
+    "chargeProfile": "CP",
+    "preconditioning": "ECC",
+}
+
+
+def _utc_iso(value=None):
+    value = value or datetime.now(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+class MockVehicle:
+    """Simulated vehicle state"""
+
+    def __init__(self, index, electric=False, driving=False):
+        self.vin = f"SADHA2B1{index:09d}"
+        self.index = index
+        self.electric = electric
+        self.driving = driving
+        self.odometer = 10000000 + index * 1000
+        self.latitude = 51.5 + index * 0.01
+        self.longitude = -1.8 - index * 0.01
+        self.locked = True
+        self.last_updated = datetime.now(timezone.utc)
+        self.trips = []
+        for _ in range(3):
+            self.add_trip()
+
+    def tick(self):
+        """Advance state for a driving vehicle"""
+        if self.driving:
+            self.odometer += 1500
+            self.latitude += 0.001
+            self.last_updated = datetime.now(timezone.utc)
+            self.add_trip()
+
+    def add_trip(self):
+        trip_id = 100000 * (self.index + 1) + len(self.trips)
+        end = datetime.now(timezone.utc) - timedelta(minutes=5)
+        start = end - timedelta(minutes=20)
+        self.trips.insert(
+            0,
+            {
+                "id": trip_id,
+                "tripDetails": {
+                    "distance": 15000,
+                    "startTime": _utc_iso(start),
+                    "endTime": _utc_iso(end),
+                    "startOdometer": self.odometer - 15000,
+                    "endOdometer": self.odometer,
+                    "averageSpeed": 45,
+                    "averageFuelConsumption": 7.5,
+                    "averageEnergyConsumption": 21.3 if self.electric else None,
+                    "totalEcoScore": {"score": 82.0},
+                    "startPosition": {
+                        "latitude": self.latitude - 0.1,
+                        "longitude": self.longitude,
+                        "address": "Start Address",
+                    },
+                    "endPosition": {
+                        "latitude": self.latitude,
+                        "longitude": self.longitude,
+                        "address": "End Address",
+                    },
+                },
+            },
+        )
+
+    def attributes(self):
+        return {
+            "nickname": f"Car {self.index}",
+            "registrationNumber": f"MK{self.index:04d}",
+            "vehicleBrand": "Jaguar",
+            "vehicleType": "I-PACE" if self.electric else "F-PACE",
+            "modelYear": 2021,
+            "fuelType": "Electric" if self.electric else "Petrol",
+            "roofType": "NORMAL",
+            "capabilities": [],
+            "availableServices": [
+                {
+                    "serviceType": code,
+                    "vehicleCapable": True,
+                    "serviceEnabled": True,
+                }
+                for code in set(SERVICE_COMMANDS.values())
+            ],
+        }
+
+    def status(self):
+        core = {
+            "ODOMETER_METER": str(self.odometer),
+            "ODOMETER_MILES": str(int(self.odometer / 1609)),
+            "PRIVACY_SWITCH": "FALSE",
+            "VEHICLE_STATE_TYPE": "KEY_ON_ENGINE_ON"
+            if self.driving
+            else "KEY_REMOVED",
+            "DOOR_IS_ALL_DOORS_LOCKED": "TRUE" if self.locked else "FALSE",
+            "THEFT_ALARM_STATUS": "ALARM_ARMED",
+            "DISTANCE_TO_EMPTY_FUEL": "450",
+            "FUEL_LEVEL_PERC": "60",
+            "TU_STATUS_SW_VERSION_MAIN": "1.0",
+        }
+        for position in ["FRONT_LEFT", "FRONT_RIGHT", "REAR_LEFT", "REAR_RIGHT"]:
+            core[f"DOOR_{position}_LOCK_STATUS"] = (
+                "LOCKED" if self.locked else "UNLOCKED"
+            )
+            core[f"DOOR_{position}_POSITION"] = "CLOSED"
+            core[f"TYRE_STATUS_{position}"] = "NORMAL"
+            core[f"TYRE_PRESSURE_{position}"] = "250"
+            core[f"WINDOW_{position}_STATUS"] = "CLOSED"
+        core["IS_SUNROOF_OPEN"] = "FALSE"
+
+        ev = {}
+        if self.electric:
+            ev = {
+                "EV_STATE_OF_CHARGE": "80",
+                "EV_CHARGING_STATUS": "NOTCONNECTED",
+                "EV_RANGE_ON_BATTERY_KM": "320",
+                "EV_RANGE_ON_BATTERY_MILES": "199",
+            }
+
+        return {
+            "vehicleStatus": {
+                "coreStatus": [{"key": k, "value": v} for k, v in core.items()],
+                "evStatus": [{"key": k, "value": v} for k, v in ev.items()],
+            },
+            "lastUpdatedTime": _utc_iso(self.last_updated),
+        }
+
+    def position(self):
+        return {
+            "position": {
+                "latitude": self.latitude,
+                "longitude": self.longitude,
+                "speed": 50 if self.driving else 0,
+                "heading": 90,
+                "timestamp": _utc_iso(self.last_updated),
+            }
+        }
+
+
+class MockInControl:
+    """Mock InControl api server.
+
+    latency and jitter are in seconds. error_rate is the fraction of
+    vehicle requests answered with a 503. Service calls report Started, then
+    Running, then Successful, over service_duration seconds.
+    """
+
+    def __init__(
+        self,
+        vehicles=1,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        service_duration=1.0,
+        electric_ratio=0.5,
+        driving_ratio=0.2,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.service_duration = service_duration
+        self.random = random.Random(seed)
+        self.vehicles = {}
+        for index in range(vehicles):
+            vehicle = MockVehicle(
+                index,
+                electric=index < vehicles * electric_ratio,
+                driving=index < vehicles * driving_ratio,
+            )
+            self.vehicles[vehicle.vin] = vehicle
+        self.services = {}
+        self.requests = Counter()
+        # Service auth tokens issued by vin and commands rejected for a
+        # missing or unknown token
+        self.auth_tokens = {}
+        self.auth_failures = 0
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes(
+            [
+                web.post("/ifas/jlr/tokens", self.tokens),
+                web.post("/ifop/jlr/users/{email}/clients", self.empty),
+                web.get("/if9/jlr/users", self.user),
+                web.get("/if9/jlr/users/{user_id}/vehicles", self.vehicle_list),
+                web.post(
+                    "/if9/jlr/vehicles/{vin}/users/{user_id}/authenticate",
+                    self.authenticate,
+                ),
+                web.get("/if9/jlr/geocode/reverse/{lat}/{lon}/en", self.geocode),
+                web.get("/if9/jlr/vehicles/{vin}/attributes", self.attributes),
+                web.get("/if9/jlr/vehicles/{vin}/status", self.status),
+                web.get("/if9/jlr/vehicles/{vin}/position", self.position),
+                web.get("/if9/jlr/vehicles/{vin}/trips", self.trips),
+                web.get("/if9/jlr/vehicles/{vin}/services", self.service_list),
+                web.get(
+                    "/if9/jlr/vehicles/{vin}/services/{service_id}",
+                    self.service_status,
+                ),
+                web.post("/if9/jlr/vehicles/{vin}/{command}", self.command),
+            ]
+        )
+
+    def tick(self):
+        """Advance simulated state of all vehicles"""
+        for vehicle in self.vehicles.values():
+            vehicle.tick()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        route = request.match_info.route.resource
+        self.requests[route.canonical if route else request.path] += 1
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if "/vehicles/" in request.path and self.random.random() < self.error_rate:
+            return web.json_response({"error": "Injected error"}, status=503)
+
+        return await handler(request)
+
+    def _vehicle(self, request):
+        vehicle = self.vehicles.get(request.match_info["vin"])
+        if not vehicle:
+            raise web.HTTPNotFound()
+        return vehicle
+
+    async def tokens(self, request):
+        return web.json_response(
+            {
+                "access_token": uuid.uuid4().hex,
+                "authorization_token": uuid.uuid4().hex,
+                "refresh_token": uuid.uuid4().hex,
+                "expires_in": "86400",
+            }
+        )
+
+    async def empty(self, request):
+        return web.Response(status=204)
+
+    async def user(self, request):
+        return web.json_response({"userId": "mockuser"})
+
+    async def vehicle_list(self, request):
+        return web.json_response(
+            {
+                "vehicles": [
+                    {"userId": "mockuser", "vin": vin, "role": "Primary"}
+                    for vin in self.vehicles
+                ]
+            }
+        )
+
+    async def authenticate(self, request):
+        vehicle = self._vehicle(request)
+        data = await request.json()
+        if not data or not data.get("serviceName"):
+            return web.json_response({"error": "No service name"}, status=400)
+        token = uuid.uuid4().hex
+        self.auth_tokens.setdefault(vehicle.vin, set()).add(token)
+        return web.json_response({"token": token})
+
+    async def geocode(self, request):
+        return web.json_response(
+            {
+                "formattedAddress": "{}, {}".format(
+                    request.match_info["lat"], request.match_info["lon"]
+                )
+            }
+        )
+
+    async def attributes(self, request):
+        return web.json_response(self._vehicle(request).attributes())
+
+    async def status(self, request):
+        return web.json_response(self._vehicle(request).status())
+
+    async def position(self, request):
+        return web.json_response(self._vehicle(request).position())
+
+    async def trips(self, request):
+        count = int(request.query.get("count", 1000))
+        return web.json_response(
+            {"trips": self._vehicle(request).trips[:count]}
+        )
+
+    async def service_list(self, request):
+        vin = self._vehicle(request).vin
+        return web.json_response(
+            {
+                "services": [
+                    f"/vehicles/{vin}/services/{service_id}"
+                    for service_id, service in self.services.items()
+                    if service["vin"] == vin
+                ]
+            }
+        )
+
+    def _service_state(self, service_id):
+        service = self.services[service_id]
+        elapsed = time.monotonic() - service["started"]
+        if elapsed < self.service_duration / 2:
+            status = "Started"
+        elif elapsed < self.service_duration:
+            status = "Running"
+        else:
+            status = "Successful"
+            if service["type"] in ["RDL", "RDU"]:
+                vehicle = self.vehicles[service["vin"]]
+                vehicle.locked = service["type"] == "RDL"
+                vehicle.last_updated = datetime.now(timezone.utc)
+        return {
+            "status": status,
+            "serviceType": service["type"],
+            "customerServiceId": service_id,
+            "vehicleId": service["vin"],
+            "failureReason": None,
+        }
+
+    async def service_status(self, request):
+        service_id = request.match_info["service_id"]
+        if service_id not in self.services:
+            raise web.HTTPNotFound()
+        return web.json_response(self._service_state(service_id))
+
+    async def command(self, request):
+        vehicle = self._vehicle(request)
+        service_type = SERVICE_COMMANDS.get(request.match_info["command"])
+        if not service_type:
+            return web.Response(status=204)
+
+        # Commands must carry a token from the vehicle's service auth
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        token = data.get("token") if isinstance(data, dict) else None
+        if token not in self.auth_tokens.get(vehicle.vin, set()):
+            self.auth_failures += 1
+            return web.json_response({"error": "Not authenticated"}, status=401)
+        self.auth_tokens[vehicle.vin].discard(token)
+
+        service_id = uuid.uuid4().hex[:20]
+        self.services[service_id] = {
+            "vin": vehicle.vin,
+            "type": service_type,
+            "started": time.monotonic(),
+        }
+        return web.json_response(self._service_state(service_id))
+
+
+async def async_start_server(mock, host="127.0.0.1", port=0):
+    """Start server and return runner and base url"""
+    runner = web.AppRunner(mock.app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--vehicles", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--service-duration", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8321)
+    args = parser.parse_args()
+
+    mock = MockInControl(
+        vehicles=args.vehicles,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        service_duration=args.service_duration,
+    )
+    web.run_app(mock.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
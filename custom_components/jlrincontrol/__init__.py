@@ -9,6 +9,7 @@ msparker@sky.com
 import asyncio
 import json
 import logging
+import time
 from datetime import timedelta
 from functools import partial
 from typing import Optional
@@ -19,6 +20,11 @@ from homeassistant.helpers.event import (
     async_call_later,
 )
 import jlrpy
+
+try:
+    from homeassistant.core import SupportsResponse
+except ImportError:  # Home Assistant before 2023.7
+    SupportsResponse = None
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import (
@@ -39,6 +45,7 @@ from homeassistant.const import (
     TEMP_FAHRENHEIT,
 )
 from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.discovery import async_load_platform
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
@@ -50,6 +57,7 @@ from homeassistant.helpers import device_registry as dr
 from homeassistant.util import dt
 
 from .const import (
+    ATTRIBUTE_RETRY_INTERVAL,
     DOMAIN,
     DATA_JLR_CONFIG,
     FUEL_TYPE_BATTERY,
@@ -59,14 +67,44 @@ from .const import (
     DEFAULT_SCAN_INTERVAL,
     MIN_SCAN_INTERVAL,
     DEFAULT_HEATH_UPDATE_INTERVAL,
+    SIGNAL_METRICS_UPDATED,
     SIGNAL_STATE_UPDATED,
     JLR_SERVICES,
+    SERVICE_GET_VEHICLE_DATA,
     JLR_DATA,
     VERSION,
     CONF_USE_CHINA_SERVERS,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DATA_CATEGORY_ATTRIBUTES,
+    DATA_CATEGORY_CORE,
+    DATA_CATEGORY_EV,
+    DATA_CATEGORY_POSITION,
+    DATA_CATEGORY_TRIP,
+    DATA_CATEGORIES,
+    SERVICE_DURATION_SMOOTHING,
+    ACTIVE_VEHICLE_STATES,
+    POSITION_MAX_AGE,
+    TRIP_SYNC_COUNT,
+    SERVICE_MONITOR_MAX_INTERVAL,
+    SERVICE_MONITOR_MIN_INTERVAL,
+    SERVICE_UPDATE_CATEGORIES,
+)
+from .api import JLRAsyncTransport, JLRTokenManager
+from .geocode import JLRGeocodeCache
+from .metrics import JLRApiMetrics
+from .models import JLRTripStatistics, JLRVehicleStatus
+from .scheduler import JLRUpdateScheduler
+from .services import JLRCommandQueue
+from .store import (
+    JLRAttributeCache,
+    JLRSnapshotStore,
+    JLRTokenStore,
+    JLRTripStore,
 )
-from .services import JLRService
-from .util import field_mask
+from .util import camel_case, field_mask
 
 # from homeassistant.helpers.icon import icon_for_battery_level
 
@@ -76,7 +114,6 @@ MIN_UPDATE_INTERVAL = timedelta(minutes=1)
 DEFAULT_UPDATE_INTERVAL = timedelta(minutes=5)
 
 HEALTH_UPDATE_TRACKER = "health_update_tracker"
-STATUS_UPDATE_TRACKER = "status_update_tracker"
 UPDATE_LISTENER = "update_listener"
 
 CONF_DEBUG_DATA = "debug_data"
@@ -127,10 +164,19 @@ CONFIG_SCHEMA = vol.Schema(
                 ): (
                     vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))
                 ),
+                vol.Optional(
+                    CONF_MAX_SCAN_INTERVAL, default=DEFAULT_MAX_SCAN_INTERVAL
+                ): (
+                    vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))
+                ),
                 vol.Optional(
                     CONF_HEALTH_UPDATE_INTERVAL,
                     default=DEFAULT_HEATH_UPDATE_INTERVAL,
                 ): vol.Coerce(int),
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS,
+                    default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=1)),
             }
         )
     },
@@ -194,9 +240,6 @@ async def async_setup_entry(hass, config_entry):
 
     data = JLRApiHandler(hass, config_entry)
 
-    update_interval = config_entry.options.get(
-        CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
-    )
     health_update_interval = config_entry.options.get(
         CONF_HEALTH_UPDATE_INTERVAL, 0
     )
@@ -208,22 +251,27 @@ async def async_setup_entry(hass, config_entry):
                 _LOGGER.error(
                     "Unable to get vehicles from api.  Check credentials"
                 )
+                data.async_stop()
                 return False
     except Exception:
+        data.async_stop()
         return False
 
-    # Do first update
-    await data.async_update()
+    # Do first update. This reuses the status retrieved during discovery.
+    # If all vehicles were restored from snapshot, entities are created from
+    # that and the first update is done in the background.
+    if data.restored:
+        data.async_create_task(data.async_update())
+    else:
+        await data.async_update()
 
-    # Poll for updates in background
+    # Poll for updates in background. Each update schedules the next one
+    # for each vehicle based on its state.
     _LOGGER.info(
-        "Update from InControl servers on {} minute interval".format(
-            int(update_interval)
+        "Update from InControl servers on {} to {} minute interval".format(
+            int(data.update_interval), int(data.max_update_interval)
         )
     )
-    update_track = async_track_time_interval(
-        hass, data.do_status_update, timedelta(minutes=update_interval),
-    )
 
     # Schedule health update and repeat interval
     if health_update_interval and health_update_interval > 0:
@@ -252,7 +300,6 @@ async def async_setup_entry(hass, config_entry):
 
     hass.data[DOMAIN][config_entry.entry_id] = {
         JLR_DATA: data,
-        STATUS_UPDATE_TRACKER: update_track,
         HEALTH_UPDATE_TRACKER: health_update_track,
         UPDATE_LISTENER: update_listener,
     }
@@ -275,6 +322,15 @@ async def async_setup_entry(hass, config_entry):
             schema=get_schema(service_info.get("schema")),
         )
 
+    if SupportsResponse:
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_GET_VEHICLE_DATA,
+            data.async_get_vehicle_data,
+            schema=vol.Schema(SERVICES_BASE_SCHEMA),
+            supports_response=SupportsResponse.ONLY,
+        )
+
     # Create vehicle devices
     await async_update_device_registry(
         hass, config_entry, data.connection.vehicles, data
@@ -292,7 +348,9 @@ def _async_import_options_from_data_if_missing(hass, config_entry):
         CONF_DISTANCE_UNIT,
         CONF_PRESSURE_UNIT,
         CONF_SCAN_INTERVAL,
+        CONF_MAX_SCAN_INTERVAL,
         CONF_HEALTH_UPDATE_INTERVAL,
+        CONF_MAX_CONCURRENT_REQUESTS,
         CONF_DEBUG_DATA,
     ]:
         if (
@@ -328,6 +386,14 @@ async def async_update_device_registry(hass, config_entry, vehicles, data):
         )
 
 
+async def async_remove_entry(hass, config_entry):
+    """Remove stored data when a config entry is removed."""
+    await JLRAttributeCache(hass, config_entry.entry_id).async_remove()
+    await JLRSnapshotStore(hass, config_entry.entry_id).async_remove()
+    await JLRTokenStore(hass, config_entry.entry_id).async_remove()
+    await JLRTripStore(hass, config_entry.entry_id).async_remove()
+
+
 async def async_unload_entry(hass, config_entry):
     """Unload a config entry."""
     _LOGGER.info("Unloading JLR InControl Component")
@@ -337,10 +403,12 @@ async def async_unload_entry(hass, config_entry):
     for service in JLR_SERVICES.items():
         _LOGGER.info("Unregister {}".format(service[0]))
         hass.services.async_remove(DOMAIN, service[0])
+    if hass.services.has_service(DOMAIN, SERVICE_GET_VEHICLE_DATA):
+        hass.services.async_remove(DOMAIN, SERVICE_GET_VEHICLE_DATA)
 
-    # Stop scheduled updates
+    # Stop scheduled updates and service call monitoring
+    hass.data[DOMAIN][config_entry.entry_id][JLR_DATA].async_stop()
     hass.data[DOMAIN][config_entry.entry_id][UPDATE_LISTENER]()
-    hass.data[DOMAIN][config_entry.entry_id][STATUS_UPDATE_TRACKER]()
     if hass.data[DOMAIN][config_entry.entry_id][HEALTH_UPDATE_TRACKER]:
         hass.data[DOMAIN][config_entry.entry_id][HEALTH_UPDATE_TRACKER]()
 
@@ -367,26 +435,57 @@ class JLRApiHandler:
         self.hass = hass
         self.config_entry = config_entry
         self.connection = None
+        self.transport = None
+        self.metrics = JLRApiMetrics()
+        self.token_manager = None
+        self.token_store = JLRTokenStore(hass, config_entry.entry_id)
         self.email = config_entry.data.get(CONF_USERNAME)
         self.password = config_entry.data.get(CONF_PASSWORD)
         self.use_china_servers = config_entry.data.get(CONF_USE_CHINA_SERVERS)
         self.vehicles = {}
-        self.entities = []
+        self._discovery_status = {}
+        self.attribute_cache = JLRAttributeCache(hass, config_entry.entry_id)
+        self.snapshot_store = JLRSnapshotStore(hass, config_entry.entry_id)
+        self.geocode_cache = JLRGeocodeCache(self)
+        self.trip_store = JLRTripStore(hass, config_entry.entry_id)
+        self.trip_statistics = {}
+        # Learned service durations by service code and running monitors
+        self.service_durations = {}
+        self.service_monitors = set()
+        # Background tasks cancelled on stop
+        self._tasks = set()
+        self._attributes_checked = None
+        # Service call queues by vehicle vin
+        self.command_queues = {}
+        # Finished service call statuses by service id with expiry time
+        self.service_status_cache = {}
+        # Entities indexed by entity_id and by vehicle vin
+        self.entities = {}
+        self.vehicle_entities = {}
         self.pin = config_entry.options.get(CONF_PIN)
         self.distance_unit = config_entry.options.get(CONF_DISTANCE_UNIT)
         self.pressure_unit = config_entry.options.get(CONF_PRESSURE_UNIT)
         self.update_interval = config_entry.options.get(
             CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
         )
+        self.max_update_interval = config_entry.options.get(
+            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+        )
+        self.scheduler = JLRUpdateScheduler(
+            hass, self, self.update_interval, self.max_update_interval
+        )
         self.health_update_interval = config_entry.options.get(
             CONF_HEALTH_UPDATE_INTERVAL
         )
 
-        self.debug_data = config_entry.options.get(CONF_DEBUG_DATA)
+        self.max_concurrent_requests = config_entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        self._request_semaphore = asyncio.Semaphore(
+            max(1, self.max_concurrent_requests)
+        )
 
-    @callback
-    def do_status_update(self, *args):
-        self.hass.async_create_task(self.async_update())
+        self.debug_data = config_entry.options.get(CONF_DEBUG_DATA)
 
     @callback
     def do_health_update(self, *args):
@@ -395,17 +494,40 @@ class JLRApiHandler:
     async def async_connect(self):
         _LOGGER.debug(f"Initialising JLR InControl v{VERSION}")
         _LOGGER.debug("Creating connection to JLR InControl API")
-        try:
-            self.connection = await self.hass.async_add_executor_job(
-                partial(jlrpy.Connection, self.email, self.password, '' , '', self.use_china_servers)
-            )
-        except Exception as ex:
-            _LOGGER.warning(
-                "Error connecting to JLRInControl.  Error is {}".format(ex)
-            )
-            return False
+
+        # Use stored refresh token if available to avoid a password login
+        token = await self.token_store.async_load()
+        if token.get("refresh_token"):
+            try:
+                with self.metrics.measure("connect"):
+                    self.connection = await self.hass.async_add_executor_job(
+                        partial(jlrpy.Connection, self.email, '', token.get("device_id", ''), token["refresh_token"], self.use_china_servers)
+                    )
+            except Exception as ex:
+                _LOGGER.debug(
+                    "Unable to connect with stored token. Error is {}".format(ex)
+                )
+
+        if not self.connection:
+            try:
+                with self.metrics.measure("connect"):
+                    self.connection = await self.hass.async_add_executor_job(
+                        partial(jlrpy.Connection, self.email, self.password, '' , '', self.use_china_servers)
+                    )
+            except Exception as ex:
+                _LOGGER.warning(
+                    "Error connecting to JLRInControl.  Error is {}".format(ex)
+                )
+                return False
 
         _LOGGER.debug("Connected to API")
+        self.token_manager = JLRTokenManager(
+            self.hass, self.connection, self.token_store, self.password
+        )
+        await self.token_manager.async_start()
+        self.transport = JLRAsyncTransport(
+            self.hass, self.connection, self.token_manager
+        )
         
         if len(self.connection.vehicles) > 0:
             _LOGGER.debug(f"Found {len(self.connection.vehicles)} vehicles.  Performing setup")
@@ -414,81 +536,187 @@ class JLRApiHandler:
             _LOGGER.debug("No vehicles found in this account")
 
         # Discover all vehicles and get one time info
+        await asyncio.gather(
+            self.attribute_cache.async_load(),
+            self.snapshot_store.async_load(),
+            self.trip_store.async_load(),
+        )
+        await asyncio.gather(
+            *[
+                self._async_discover_vehicle(vehicle)
+                for vehicle in self.connection.vehicles
+            ]
+        )
+
+        # Add vehicles to collection in account order
         for vehicle in self.connection.vehicles:
-            # Get attributes
-            vehicle.attributes = await self.hass.async_add_executor_job(
-                vehicle.get_attributes
+            self.vehicles[vehicle.vin] = vehicle
+
+            # Trip totals from stored trip history
+            statistics = self.trip_statistics[vehicle.vin] = JLRTripStatistics(
+                vehicle.engine_type == FUEL_TYPE_BATTERY
             )
+            statistics.add_records(self.trip_store.get(vehicle.vin))
 
-            if vehicle.attributes:
-                _LOGGER.debug(f"Retrieved attribute data for {field_mask(vehicle.vin, 3, 2)}")
-            else:
-                _LOGGER.debug(f"Attribute data is empty for {field_mask(vehicle.vin, 3, 2)}")
+        return True
 
-            #Get status
-            status = await self.hass.async_add_executor_job(
-                vehicle.get_status
-            )
+    async def _async_discover_vehicle(self, vehicle):
+        # Get attributes and status. Cached attributes are used if available
+        # and revalidated after setup. If a snapshot of the last update
+        # exists, status is restored from it and refreshed by the first update.
+        cached_attributes = self.attribute_cache.get(vehicle.vin)
+        snapshot = self.snapshot_store.get(vehicle.vin)
+        vehicle.attributes, status = await asyncio.gather(
+            self._async_value(cached_attributes)
+            if cached_attributes is not None
+            else self.async_request("get_attributes", vehicle.vin),
+            self._async_value(None)
+            if snapshot
+            else self.async_request("get_status", vehicle.vin),
+        )
 
+        if cached_attributes is None:
+            self.attribute_cache.set(vehicle.vin, vehicle.attributes)
+
+        if vehicle.attributes:
+            _LOGGER.debug(f"Retrieved attribute data for {field_mask(vehicle.vin, 3, 2)}")
+        else:
+            _LOGGER.debug(f"Attribute data is empty for {field_mask(vehicle.vin, 3, 2)}")
+
+        if snapshot:
+            vehicle.status = JLRVehicleStatus(snapshot.get("status"))
+            vehicle.status_ev = JLRVehicleStatus(snapshot.get("status_ev"))
+            vehicle.position = snapshot.get("position")
+            vehicle.address = snapshot.get("address")
+            vehicle.position_time = None
+            vehicle.last_trip = snapshot.get("last_trip")
+            vehicle.stale = True
+            _LOGGER.debug(f"Restored status data for {field_mask(vehicle.vin, 3, 2)}")
+        else:
             if status:
                 _LOGGER.debug(f"Retrieved status data for {field_mask(vehicle.vin, 3, 2)}")
             else:
                 _LOGGER.debug(f"Status data is empty for {field_mask(vehicle.vin, 3, 2)}")
 
-            # Set vehicle engine type
-            _LOGGER.debug(f"Vehicle fuel type is {vehicle.attributes.get('fuelType', 'Unknown')}")
+            vehicle.status = JLRVehicleStatus()
+            vehicle.status_ev = JLRVehicleStatus()
+            self._set_vehicle_status(vehicle, status)
+            vehicle.position = None
+            vehicle.address = None
+            vehicle.position_time = None
+            vehicle.last_trip = None
+            vehicle.stale = False
+
+            # Keep status to be used by the first update
+            self._discovery_status[vehicle.vin] = status
+
+        # Revision of each data category, incremented when it changes
+        vehicle.revisions = dict.fromkeys(DATA_CATEGORIES, 0)
+        vehicle.data_dump = None
+
+        # Set vehicle engine type
+        _LOGGER.debug(f"Vehicle fuel type is {vehicle.attributes.get('fuelType', 'Unknown')}")
+
+        if vehicle.attributes.get("fuelType") == FUEL_TYPE_BATTERY:
+            vehicle.engine_type = FUEL_TYPE_BATTERY
+        elif vehicle.status_ev.get("EV_PHEV_RANGE_COMBINED_KM"):
+            vehicle.engine_type = FUEL_TYPE_HYBRID
+        else:
+            vehicle.engine_type = FUEL_TYPE_ICE
 
-            if status["vehicleStatus"].get("coreStatus"):
-                vehicle.status = {
-                    d["key"]: d["value"] for d in status["vehicleStatus"]["coreStatus"]
-                }
-            else:
-                vehicle.status = None
+        _LOGGER.debug(
+            f"Discovered {vehicle.attributes.get('vehicleBrand')} {vehicle.attributes.get('vehicleType')} {vehicle.engine_type} Vehicle - {field_mask(vehicle.vin, 3, 2)}"
+        )
 
-            if status["vehicleStatus"].get("evStatus"):
-                status_ev = {
-                    d["key"]: d["value"] for d in status["vehicleStatus"]["evStatus"]
-                }
-            else:
-                status_ev = None
+        # Add one time dump of attr and status data for debugging
+        if self.debug_data:
+            _LOGGER.debug(f"ATTRIBUTE DATA - {vehicle.attributes}")
+            _LOGGER.debug(f"STATUS DATA - {status}")
 
-            if vehicle.attributes.get("fuelType") == FUEL_TYPE_BATTERY:
-                vehicle.engine_type = FUEL_TYPE_BATTERY
-            elif status_ev and status_ev.get("EV_PHEV_RANGE_COMBINED_KM"):
-                vehicle.engine_type = FUEL_TYPE_HYBRID
-            else:
-                vehicle.engine_type = FUEL_TYPE_ICE
+    @property
+    def restored(self):
+        """Return true if all vehicles were restored from snapshot."""
+        return all(vehicle.stale for vehicle in self.vehicles.values())
+
+    @callback
+    def _async_check_attributes(self):
+        """Revalidate cached attributes in the background once stale.
+
+        Checked after each update. A failed revalidation is retried after
+        the retry interval.
+        """
+        now = time.monotonic()
+        if (
+            self._attributes_checked is not None
+            and now - self._attributes_checked < ATTRIBUTE_RETRY_INTERVAL
+        ):
+            return
+        if not any(self.attribute_cache.is_stale(vin) for vin in self.vehicles):
+            return
+        self._attributes_checked = now
+        self.async_create_task(self.async_revalidate_attributes())
+
+    async def async_revalidate_attributes(self):
+        """Refresh cached attributes older than the cache ttl."""
+        vins = [
+            vin for vin in self.vehicles if self.attribute_cache.is_stale(vin)
+        ]
+        if not vins:
+            return
+
+        results = await asyncio.gather(
+            *[self.async_request("get_attributes", vin) for vin in vins],
+            return_exceptions=True,
+        )
 
+        changes = {}
+        for vin, attributes in zip(vins, results):
+            if isinstance(attributes, Exception) or not attributes:
+                _LOGGER.debug(
+                    "Unable to revalidate attributes for {}. Error is {}".format(
+                        field_mask(vin, 3, 2), attributes
+                    )
+                )
+                continue
+            if attributes != self.vehicles[vin].attributes:
+                changes[vin] = {DATA_CATEGORY_ATTRIBUTES: None}
+            self.vehicles[vin].attributes = attributes
+            self.attribute_cache.set(vin, attributes)
             _LOGGER.debug(
-                f"Discovered {vehicle.attributes.get('vehicleBrand')} {vehicle.attributes.get('vehicleType')} {vehicle.engine_type} Vehicle - {field_mask(vehicle.vin, 3, 2)}"
+                f"Revalidated attribute data for {field_mask(vin, 3, 2)}"
             )
 
-            #Add vehicle to collection
-            self.vehicles[vehicle.vin] = vehicle
+        self._async_send_changes(changes)
 
-            # Add one time dump of attr and status data for debugging
-            if self.debug_data:
-                _LOGGER.debug(f"ATTRIBUTE DATA - {vehicle.attributes}")
-                _LOGGER.debug(f"STATUS DATA - {status}")
-                
-        return True
+    def _set_vehicle_status(self, vehicle, status):
+        """Update core and ev status from a status response.
+
+        Returns the sets of changed core and ev keys.
+        """
+        vehicle_status = status.get("vehicleStatus", {}) if status else {}
+
+        # Read all values first so a malformed response changes nothing
+        core_items = [
+            (d["key"], d["value"])
+            for d in vehicle_status.get("coreStatus") or []
+        ]
+        updated_time = status.get("lastUpdatedTime") if status else None
+        core_items.append(("lastUpdatedTime", updated_time))
+        ev_items = [
+            (d["key"], d["value"]) for d in vehicle_status.get("evStatus") or []
+        ]
+        return (
+            vehicle.status.update(core_items),
+            vehicle.status_ev.update(ev_items),
+        )
 
     async def async_call_service(self, service):
         entity_id = service.data.get(ATTR_ENTITY_ID)
-        entity = next(
-            (
-                entity
-                for entity in self.hass.data[DOMAIN][
-                    self.config_entry.entry_id
-                ][JLR_DATA].entities
-                if entity.entity_id == entity_id
-            ),
-            None,
-        )
+        entity = self.entities.get(entity_id)
 
         # Get service info
         if entity and JLR_SERVICES[service.service]:
-            vin = entity._vin
+            vin = entity.vin
             kwargs = {}
             kwargs["service_name"] = JLR_SERVICES[service.service].get(
                 "function_name"
@@ -498,8 +726,7 @@ class JLRApiHandler:
             )
             for k, v in service.data.items():
                 kwargs[k] = v
-            jlr_service = JLRService(self.hass, self.config_entry, vin)
-            status = await jlr_service.async_call_service(**kwargs)
+            status = await self.async_queue_service(vin, **kwargs)
 
             if status and status == "Successful":
                 _LOGGER.debug(
@@ -509,118 +736,482 @@ class JLRApiHandler:
                         self.vehicles[vin].attributes.get("nickname"),
                     )
                 )
-            # Call update on return of monitor
-            await self.async_update()
 
-    async def async_update(self):
-        try:
-            for vehicle in self.vehicles:
-                status = await self.hass.async_add_executor_job(
-                    self.vehicles[vehicle].get_status
-                )
-                last_updated = status.get("lastUpdatedTime")
-                
-                status_core = {
-                    d["key"]: d["value"] for d in status["vehicleStatus"].get("coreStatus")
-                }
-                status_core["lastUpdatedTime"] = last_updated
-                self.vehicles[vehicle].status = status_core
-
-                status_ev = {}
-                if self.vehicles[vehicle].engine_type in [FUEL_TYPE_BATTERY, FUEL_TYPE_HYBRID]:
-                    status_ev = {
-                        d["key"]: d["value"] for d in status["vehicleStatus"].get("evStatus")
-                    }
-                    self.vehicles[vehicle].status_ev = status_ev
-                
-                
-                _LOGGER.debug(
-                    "Received status data update for {}".format(
-                        self.vehicles[vehicle].attributes.get("nickname")
-                    )
+    async def async_get_vehicle_data(self, service):
+        """Return all data of the vehicle of an entity as service response."""
+        entity = self.entities.get(service.data.get(ATTR_ENTITY_ID))
+        if not entity:
+            raise HomeAssistantError(
+                "{} is not a JLR InControl entity".format(
+                    service.data.get(ATTR_ENTITY_ID)
                 )
-                
+            )
+        return dict(self.get_vehicle_data(entity.vin))
+
+    async def async_queue_service(self, vin, refresh=True, **kwargs):
+        """Call service on vehicle via its command queue.
+
+        Vehicle data affected by the service is updated on return of the
+        service monitor unless refresh is False.
+        """
+        if vin not in self.command_queues:
+            self.command_queues[vin] = JLRCommandQueue(self, vin)
+        return await self.command_queues[vin].async_call_service(
+            refresh, **kwargs
+        )
+
+    @callback
+    def async_register_entity(self, entity):
+        """Add entity to the entity indexes."""
+        self.entities[entity.entity_id] = entity
+        self.vehicle_entities.setdefault(entity.vin, {})[
+            entity.entity_id
+        ] = entity
+
+    @callback
+    def async_unregister_entity(self, entity_id, vin):
+        """Remove entity from the entity indexes."""
+        self.entities.pop(entity_id, None)
+        self.vehicle_entities.get(vin, {}).pop(entity_id, None)
+
+    def get_service_check_interval(self, service_code):
+        """Return first interval to check a service call status.
+
+        Uses half the learned duration of the service so the first checks
+        land close to the expected completion time.
+        """
+        duration = self.service_durations.get(service_code)
+        if not duration:
+            return SERVICE_MONITOR_MIN_INTERVAL
+        return min(
+            max(duration / 2, SERVICE_MONITOR_MIN_INTERVAL),
+            SERVICE_MONITOR_MAX_INTERVAL,
+        )
+
+    def record_service_duration(self, service_code, duration):
+        """Update learned duration for a completed service call."""
+        previous = self.service_durations.get(service_code)
+        if previous:
+            duration = (
+                SERVICE_DURATION_SMOOTHING * duration
+                + (1 - SERVICE_DURATION_SMOOTHING) * previous
+            )
+        self.service_durations[service_code] = duration
 
-                position = await self.hass.async_add_executor_job(
-                    self.vehicles[vehicle].get_position
+    @callback
+    def async_stop(self):
+        """Stop updates, token refresh, service calls and background tasks."""
+        self.scheduler.async_stop()
+        if self.token_manager:
+            self.token_manager.async_stop()
+        for queue in self.command_queues.values():
+            queue.async_cancel()
+        for task in list(self.service_monitors) + list(self._tasks):
+            task.cancel()
+
+    @callback
+    def async_create_task(self, target):
+        """Run a background task that is cancelled on stop."""
+        task = self.hass.async_create_task(target)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def async_add_job(self, target, *args):
+        """Run a blocking jlrpy call in the executor within the request cap.
+
+        Used for service commands. Data requests use async_request.
+        """
+        name = getattr(target, "func", target).__name__
+        async with self._request_semaphore:
+            with self.metrics.measure(name):
+                return await self.hass.async_add_executor_job(target, *args)
+
+    async def async_request(self, endpoint, *args):
+        """Request an api endpoint via the async transport within the cap."""
+        async with self._request_semaphore:
+            with self.metrics.measure(endpoint):
+                return await getattr(self.transport, endpoint)(*args)
+
+    def get_vehicle_data(self, vin):
+        """Return all attribute, status and position data of a vehicle.
+
+        Built on first use and cached until the vehicle data changes.
+        """
+        vehicle = self.vehicles[vin]
+        revision = tuple(vehicle.revisions.values())
+        if vehicle.data_dump and vehicle.data_dump[0] == revision:
+            return vehicle.data_dump[1]
+
+        attributes = {
+            key: value
+            for key, value in vehicle.attributes.items()
+            if key not in ["capabilities", "availableServices"]
+        }
+        dump = {
+            "attributes": dict(sorted(attributes.items())),
+            "core status": dict(
+                sorted(
+                    (camel_case(key), value)
+                    for key, value in vehicle.status.items()
+                )
+            ),
+        }
+        if vehicle.engine_type in [FUEL_TYPE_BATTERY, FUEL_TYPE_HYBRID]:
+            dump["ev status"] = dict(
+                sorted(
+                    (camel_case(key), value)
+                    for key, value in vehicle.status_ev.items()
                 )
+            )
+        dump["position"] = dict(sorted((vehicle.position or {}).items()))
 
-                if position:
-                    self.vehicles[vehicle].position = position
-                    _LOGGER.debug(
-                        "Received position data update for {}".format(
-                            self.vehicles[vehicle].attributes.get("nickname")
-                        )
-                    )
-                else:
-                    self.vehicles[vehicle].position = None
-                    _LOGGER.debug(
-                        "No position data received for {}".format(
-                            self.vehicles[vehicle].attributes.get("nickname")
-                        )
-                    )
+        vehicle.data_dump = (revision, dump)
+        return dump
 
-                # Only get trip data if privacy mode is not enabled
-                if status_core.get("PRIVACY_SWITCH") == "FALSE":
-                    trips = await self.hass.async_add_executor_job(
-                        self.vehicles[vehicle].get_trips, 1
-                    )
-                    if trips and trips.get("trips"):
-                        self.vehicles[vehicle].last_trip = trips.get("trips")[
-                            0
-                        ]
-                        _LOGGER.debug(
-                            "Retieved trip data update for {}".format(
-                                self.vehicles[vehicle].attributes.get(
-                                    "nickname"
-                                )
-                            )
-                        )
-                    else:
-                        self.vehicles[vehicle].last_trip = None
-                        _LOGGER.debug(
-                            "No trip data received for {}".format(
-                                self.vehicles[vehicle].attributes.get(
-                                    "nickname"
-                                )
-                            )
-                        )
-                else:
-                    self.vehicles[vehicle].last_trip = None
-                    _LOGGER.debug(
-                        "Privacy mode is enabled. "
-                        + "Trip data will not be loaded for {}".format(
-                            self.vehicles[vehicle].attributes.get("nickname")
-                        )
-                    )
+    async def _async_value(self, value):
+        """Return value. Used in place of a request when gathering."""
+        return value
+
+    async def async_update(self, vins=None):
+        """Update vehicles in vins, or all vehicles, and schedule the next."""
+        vins = list(self.vehicles) if vins is None else vins
+        start = time.monotonic()
+        try:
+            # Poll vehicles concurrently. Total poll time is that of the
+            # slowest vehicle, bounded by the concurrent request cap.
+            results = await asyncio.gather(
+                *[self._async_update_vehicle(vin) for vin in vins]
+            )
+            changes = dict(zip(vins, results))
+            self.metrics.vehicle_update_failures += results.count(None)
 
             _LOGGER.info(
-                "JLR InControl update received for {}".format(
-                    self.vehicles[vehicle].attributes.get("nickname")
+                "JLR InControl update received for {} of {} vehicles".format(
+                    len(results) - results.count(None), len(results)
                 )
             )
 
-            # Send update notice to all components to update
-            async_dispatcher_send(self.hass, SIGNAL_STATE_UPDATED)
+            # Send update notice for changed data so only affected
+            # entities update
+            self._async_send_changes(changes)
+            self.metrics.update.record(time.monotonic() - start)
         except Exception as ex:
+            self.metrics.update.record(time.monotonic() - start, ex)
             _LOGGER.debug(
                 "Unable to update data from JLRInControl servers."
                 + "May be down or you have a internet connectivity issue. "
                 + "Error is : {}".format(ex)
             )
 
-    async def async_health_update(self):
+        self.scheduler.async_schedule()
+        self._async_check_attributes()
+        self.metrics.last_update_time = round(time.monotonic() - start, 3)
+        async_dispatcher_send(
+            self.hass, SIGNAL_METRICS_UPDATED.format(self.config_entry.entry_id)
+        )
+
+    @callback
+    def _async_send_changes(self, changes):
+        """Send state updated signals for changed vehicle data.
+
+        Changes are a dict of vin to a dict of data category to the set of
+        changed keys, or None if keys are not tracked for the category.
+        One signal is sent per vehicle so each entity updates at most once.
+        The revision of each changed category is incremented first.
+        """
+        for vin, categories in changes.items():
+            if not categories:
+                continue
+            for category in categories:
+                self.vehicles[vin].revisions[category] += 1
+            async_dispatcher_send(
+                self.hass, SIGNAL_STATE_UPDATED.format(vin), categories
+            )
+
+    async def async_update_vehicle(self, vin, categories=DATA_CATEGORIES):
+        """Update a single vehicle.
+
+        Status is always requested as it holds core and ev data. Position
+        and trips are only requested if in categories.
+        """
+        changes = await self._async_update_vehicle(vin, categories)
+        if changes:
+            self._async_send_changes({vin: changes})
+        self.scheduler.async_schedule()
+
+    async def async_update_after_service(self, vin, service_code):
+        """Update the data of a vehicle a service call can affect."""
+        categories = SERVICE_UPDATE_CATEGORIES.get(service_code, DATA_CATEGORIES)
+        if categories:
+            await self.async_update_vehicle(vin, categories)
+
+    async def _async_update_vehicle(self, vin, categories=DATA_CATEGORIES):
+        """Update vehicle data and return changes by data category.
+
+        Returns None if the update failed, leaving the vehicle unchanged.
+        """
+        vehicle = self.vehicles[vin]
         try:
-            for vehicle in self.vehicles:
-                service = JLR_SERVICES["update_health_status"]
-                kwargs = {}
-                kwargs["service_name"] = service.get("function_name")
-                kwargs["service_code"] = service.get("service_code")
-                jlr_service = JLRService(self.hass, self.config_entry, vehicle)
-                await jlr_service.async_call_service(**kwargs)
-            return True
+            return await self._async_update_vehicle_data(vehicle, categories)
         except Exception as ex:
             _LOGGER.debug(
-                "Error when requesting health status update. "
-                + "Error is {}".format(ex)
+                "Unable to update data for {}. Error is : {}".format(
+                    vehicle.attributes.get("nickname"), ex
+                )
+            )
+            self.scheduler.async_vehicle_updated(vin, False)
+            return None
+
+    async def _async_update_vehicle_data(self, vehicle, categories):
+        """Request vehicle data and apply it to the vehicle.
+
+        All requests are finished before the vehicle is changed so a
+        failure part way through leaves it as it was.
+        """
+        vin = vehicle.vin
+        nickname = vehicle.attributes.get("nickname")
+
+        # Status fetched during discovery is used for the first update so
+        # only position and trips need requesting.
+        status = self._discovery_status.pop(vin, None)
+        first_update = status is not None
+        if not first_update:
+            status = await self.async_request("get_status", vin)
+
+        # An empty response is a failed update, not a vehicle reporting
+        # no data, so the last known data is kept
+        if not status or not status.get("vehicleStatus"):
+            raise ValueError("No status data received")
+
+        # If the vehicle has not reported since the last update, its
+        # position and trips have not changed either so skip them.
+        updated_time = status.get("lastUpdatedTime")
+        if (
+            not first_update
+            and updated_time
+            and vehicle.status
+            and updated_time == vehicle.status.get("lastUpdatedTime")
+        ):
+            _LOGGER.debug(
+                "No new data reported by {} since {}".format(
+                    nickname, updated_time
+                )
+            )
+            return self._async_vehicle_unchanged(vehicle)
+
+        # Position and trips are independent calls so request them
+        # together. Trip data is only requested if privacy mode is off.
+        privacy = self._get_core_value(status, "PRIVACY_SWITCH") != "FALSE"
+        get_position = DATA_CATEGORY_POSITION in categories and (
+            self._should_get_position(vehicle, status)
+        )
+        get_trips = DATA_CATEGORY_TRIP in categories and not privacy
+        # A failed position or trips request leaves that data unchanged
+        # so the status is still applied.
+        position, trips = await asyncio.gather(
+            self.async_request("get_position", vin)
+            if get_position
+            else self._async_value(None),
+            self._async_sync_trips(vin)
+            if get_trips
+            else self._async_value(None),
+            return_exceptions=True,
+        )
+
+        if isinstance(position, Exception):
+            get_position = False
+            _LOGGER.debug(
+                "Unable to update position data for {}. Error is : {}".format(
+                    nickname, position
+                )
+            )
+        if isinstance(trips, Exception):
+            get_trips = False
+            _LOGGER.debug(
+                "Unable to update trip data for {}. Error is : {}".format(
+                    nickname, trips
+                )
+            )
+
+        if not get_position:
+            position = vehicle.position
+        elif position:
+            _LOGGER.debug(
+                "Received position data update for {}".format(nickname)
+            )
+        else:
+            position = None
+            _LOGGER.debug("No position data received for {}".format(nickname))
+
+        # Only use trip data if privacy mode is not enabled
+        if privacy:
+            last_trip = None
+            _LOGGER.debug(
+                "Privacy mode is enabled. "
+                + "Trip data will not be loaded for {}".format(nickname)
             )
+        elif not get_trips:
+            last_trip = vehicle.last_trip
+        elif trips:
+            last_trip = trips[0]
+            _LOGGER.debug("Retieved trip data update for {}".format(nickname))
+        else:
+            last_trip = None
+            _LOGGER.debug("No trip data received for {}".format(nickname))
+
+        # Look up address of a new position. Addresses are cached by area
+        # so a vehicle that has not moved far needs no request.
+        address = vehicle.address
+        if position != vehicle.position:
+            coordinates = (position or {}).get("position") or {}
+            if (
+                coordinates.get("latitude") is not None
+                and coordinates.get("longitude") is not None
+            ):
+                address = await self.geocode_cache.async_get_address(
+                    coordinates["latitude"], coordinates["longitude"]
+                )
+            else:
+                address = None
+
+        core_changes, ev_changes = self._set_vehicle_status(vehicle, status)
+        _LOGGER.debug("Received status data update for {}".format(nickname))
+
+        changes = {
+            DATA_CATEGORY_CORE: core_changes,
+            DATA_CATEGORY_EV: ev_changes,
+        }
+        if position != vehicle.position:
+            changes[DATA_CATEGORY_POSITION] = None
+        if last_trip != vehicle.last_trip:
+            changes[DATA_CATEGORY_TRIP] = None
+
+        if get_position and position:
+            vehicle.position_time = time.monotonic()
+        vehicle.position = position
+        vehicle.address = address
+        vehicle.last_trip = last_trip
+        vehicle.stale = False
+        self.snapshot_store.set(vehicle)
+        self.scheduler.async_vehicle_updated(vin)
+
+        return {
+            category: keys
+            for category, keys in changes.items()
+            if keys is None or keys
+        }
+
+    async def _async_sync_trips(self, vin):
+        """Store trips newer than the newest stored trip of a vehicle.
+
+        The api only returns the latest trips, so the newest is requested
+        first and more only if it is not already stored. Returns the
+        requested trips, newest first.
+        """
+        last_id = self.trip_store.last_trip_id(vin)
+        count = 1 if last_id is not None else TRIP_SYNC_COUNT
+        result = await self.async_request("get_trips", vin, count)
+        trips = (result or {}).get("trips") or []
+        if not trips or trips[0].get("id") == last_id:
+            return trips
+
+        if count == 1:
+            result = await self.async_request("get_trips", vin, TRIP_SYNC_COUNT)
+            trips = (result or {}).get("trips") or trips
+
+        new_trips = []
+        for trip in trips:
+            if last_id is not None and trip.get("id") == last_id:
+                break
+            new_trips.append(trip)
+        else:
+            if last_id is not None:
+                _LOGGER.debug(
+                    "More than {} new trips for {}. Older trips are missing "
+                    "from trip history".format(
+                        TRIP_SYNC_COUNT, field_mask(vin, 3, 2)
+                    )
+                )
+
+        added = await self.trip_store.async_add(vin, new_trips)
+        for record in added:
+            self.trip_statistics[vin].add(record)
+        _LOGGER.debug(
+            "Stored {} new trips for {}".format(len(added), field_mask(vin, 3, 2))
+        )
+        return trips
+
+    @callback
+    def _async_vehicle_unchanged(self, vehicle):
+        """Finish an update of a vehicle with no new data and return changes.
+
+        Only a vehicle restored from snapshot has a change, its stale flag.
+        """
+        changes = {}
+        if vehicle.stale:
+            vehicle.stale = False
+            changes[DATA_CATEGORY_CORE] = {"lastUpdatedTime"}
+        self.scheduler.async_vehicle_updated(vehicle.vin)
+        return changes
+
+    @staticmethod
+    def _get_core_value(status, key):
+        """Return value of a core status key from a status response."""
+        core_status = (status or {}).get("vehicleStatus", {}).get(
+            "coreStatus"
+        )
+        for item in core_status or []:
+            if item["key"] == key:
+                return item["value"]
+        return None
+
+    def _should_get_position(self, vehicle, status):
+        """Return true if the position of a vehicle may have changed.
+
+        Position is requested if the vehicle is active or its odometer has
+        moved, and otherwise only once the last fix is older than the max
+        position age. In between, the last known position is kept.
+        """
+        if vehicle.position is None or vehicle.position_time is None:
+            return True
+        if (
+            self._get_core_value(status, "VEHICLE_STATE_TYPE")
+            in ACTIVE_VEHICLE_STATES
+        ):
+            return True
+        if self._get_core_value(
+            status, "ODOMETER_METER"
+        ) != vehicle.status.get("ODOMETER_METER"):
+            return True
+        return time.monotonic() - vehicle.position_time > POSITION_MAX_AGE
+
+    async def async_health_update(self):
+        """Request health status from all vehicles and update once done."""
+        service = JLR_SERVICES["update_health_status"]
+        kwargs = {}
+        kwargs["service_name"] = service.get("function_name")
+        kwargs["service_code"] = service.get("service_code")
+
+        # Requests are capped by the request semaphore, so all vehicles are
+        # monitored together rather than waiting for each other's calls
+        results = await asyncio.gather(
+            *[
+                self.async_queue_service(vin, False, **kwargs)
+                for vin in self.vehicles
+            ],
+            return_exceptions=True,
+        )
+
+        for vin, result in zip(self.vehicles, results):
+            if isinstance(result, Exception):
+                _LOGGER.debug(
+                    "Error when requesting health status update for {}. ".format(
+                        self.vehicles[vin].attributes.get("nickname")
+                    )
+                    + "Error is {}".format(result)
+                )
+
+        # Update all vehicles once all health requests have finished
+        await self.async_update()
+        return True
@@ -0,0 +1,215 @@
+"""Async transport and token management for the JLR InControl api."""
+import asyncio
+import calendar
+import json
+import logging
+from datetime import datetime
+
+import aiohttp
+
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    API_TIMEOUT,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_REFRESH_RETRY_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JLRTokenManager:
+    """Keep the access token of the jlrpy connection valid.
+
+    Tokens are refreshed in the background ahead of expiry and on demand if
+    a request is rejected. The refresh token is persisted so a restart does
+    not need a password login.
+    """
+
+    def __init__(self, hass, connection, token_store, password):
+        self.hass = hass
+        self.connection = connection
+        self._token_store = token_store
+        self._password = password
+        self._lock = asyncio.Lock()
+        self._unsub_refresh = None
+
+    @property
+    def expires_in(self):
+        """Seconds until the access token expires.
+
+        jlrpy sets expiration from local time read as utc, so the same
+        clock is used here rather than time.time().
+        """
+        return self.connection.expiration - calendar.timegm(
+            datetime.now().timetuple()
+        )
+
+    async def async_start(self):
+        await self._async_save()
+        self._async_schedule_refresh(self.expires_in - TOKEN_REFRESH_MARGIN)
+
+    @callback
+    def async_stop(self):
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+
+    @callback
+    def _async_schedule_refresh(self, delay):
+        self.async_stop()
+        self._unsub_refresh = async_call_later(
+            self.hass,
+            max(delay, TOKEN_REFRESH_RETRY_DELAY),
+            self._async_scheduled_refresh,
+        )
+
+    async def _async_scheduled_refresh(self, *args):
+        self._unsub_refresh = None
+        try:
+            await self.async_refresh()
+        except Exception as ex:
+            _LOGGER.warning(
+                "Unable to refresh JLR InControl access token. "
+                + "Error is {}".format(ex)
+            )
+            self._async_schedule_refresh(TOKEN_REFRESH_RETRY_DELAY)
+
+    async def async_ensure_valid(self):
+        """Refresh token if it has expired."""
+        if self.expires_in <= 0:
+            await self.async_refresh(self.connection.access_token)
+
+    async def async_refresh(self, expired_token=None):
+        """Refresh access token.
+
+        If expired_token is given and the token has already been refreshed
+        by another request while waiting, no refresh is done.
+        """
+        async with self._lock:
+            if (
+                expired_token is not None
+                and self.connection.access_token != expired_token
+            ):
+                return
+
+            try:
+                await self.hass.async_add_executor_job(
+                    self.connection.refresh_tokens
+                )
+                _LOGGER.debug("Refreshed JLR InControl access token")
+            except Exception as ex:
+                _LOGGER.debug(
+                    "Unable to refresh access token, logging in again. "
+                    + "Error is {}".format(ex)
+                )
+                self.connection.oauth = {
+                    "grant_type": "password",
+                    "username": self.connection.email,
+                    "password": self._password,
+                }
+                await self.hass.async_add_executor_job(self.connection.connect)
+
+            await self._async_save()
+            self._async_schedule_refresh(self.expires_in - TOKEN_REFRESH_MARGIN)
+
+    async def _async_save(self):
+        await self._token_store.async_save(
+            self.connection.device_id, self.connection.refresh_token
+        )
+
+
+class JLRAsyncTransport:
+    """Async requests to the InControl vehicle data endpoints.
+
+    Requests the same endpoints as jlrpy.Vehicle but using the Home Assistant
+    shared aiohttp session, so connections are pooled and kept alive rather
+    than using an executor thread and new connection per request.
+    Authentication headers are taken from the jlrpy connection.
+    """
+
+    def __init__(self, hass, connection, token_manager):
+        self.hass = hass
+        self.connection = connection
+        self.token_manager = token_manager
+        self._session = async_get_clientsession(hass)
+
+    async def async_get(self, url, accept=None):
+        """Get url, retrying once with a new token if unauthorised."""
+        await self.token_manager.async_ensure_valid()
+        access_token = self.connection.access_token
+        try:
+            return await self._async_get(url, accept)
+        except aiohttp.ClientResponseError as ex:
+            if ex.status != 401:
+                raise
+        _LOGGER.debug("Access token was rejected. Refreshing and retrying")
+        await self.token_manager.async_refresh(access_token)
+        return await self._async_get(url, accept)
+
+    async def _async_get(self, url, accept=None):
+        headers = self.connection.head.copy()
+        if accept:
+            headers["Accept"] = accept
+
+        async with self._session.get(
+            url,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=API_TIMEOUT),
+        ) as response:
+            response.raise_for_status()
+            text = await response.text()
+
+        if text:
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError:
+                return None
+        return None
+
+    async def async_vehicle_get(self, vin, command, accept=None):
+        return await self.async_get(
+            f"{self.connection.base.IF9}/vehicles/{vin}/{command}", accept
+        )
+
+    async def get_attributes(self, vin):
+        return await self.async_vehicle_get(
+            vin,
+            "attributes",
+            "application/vnd.ngtp.org.VehicleAttributes-v8+json",
+        )
+
+    async def get_status(self, vin):
+        return await self.async_vehicle_get(
+            vin,
+            "status?includeInactive=true",
+            "application/vnd.ngtp.org.if9.healthstatus-v4+json",
+        )
+
+    async def get_position(self, vin):
+        return await self.async_vehicle_get(vin, "position")
+
+    async def get_trips(self, vin, count=1000):
+        return await self.async_vehicle_get(
+            vin,
+            f"trips?count={count}",
+            "application/vnd.ngtp.org.triplist-v2+json",
+        )
+
+    async def get_services(self, vin):
+        return await self.async_vehicle_get(vin, "services")
+
+    async def get_service_status(self, vin, service_id):
+        return await self.async_vehicle_get(
+            vin,
+            f"services/{service_id}",
+            "application/vnd.wirelesscar.ngtp.if9.ServiceStatus-v4+json",
+        )
+
+    async def reverse_geocode(self, lat, lon):
+        return await self.async_get(
+            f"{self.connection.base.IF9}/geocode/reverse/{lat}/{lon}/en",
+            "application/json",
+        )
@@ -25,6 +25,10 @@ from .const import (
     MIN_SCAN_INTERVAL,
     DEFAULT_HEATH_UPDATE_INTERVAL,
     CONF_USE_CHINA_SERVERS,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_SCAN_INTERVAL,
 )
 
 CONF_ALL_DATA_SENSOR = "all_data_sensor"
@@ -165,6 +169,14 @@ class JLRInControlOptionsFlowHandler(config_entries.OptionsFlow):
                 ): (
                     vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))
                 ),
+                vol.Optional(
+                    CONF_MAX_SCAN_INTERVAL,
+                    default=self.options.get(
+                        CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                    ),
+                ): (
+                    vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))
+                ),
                 vol.Optional(
                     CONF_HEALTH_UPDATE_INTERVAL,
                     default=self.options.get(
@@ -172,6 +184,13 @@ class JLRInControlOptionsFlowHandler(config_entries.OptionsFlow):
                         DEFAULT_HEATH_UPDATE_INTERVAL,
                     ),
                 ): vol.Coerce(int),
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS,
+                    default=self.options.get(
+                        CONF_MAX_CONCURRENT_REQUESTS,
+                        DEFAULT_MAX_CONCURRENT_REQUESTS,
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=1)),
                 vol.Optional(
                     CONF_DISTANCE_UNIT,
                     default=self.options.get(
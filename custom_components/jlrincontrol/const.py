@@ -1,4 +1,5 @@
 import logging
+from datetime import timedelta
 from homeassistant.const import (
     ENERGY_KILO_WATT_HOUR,
     TEMP_CELSIUS,
@@ -17,12 +18,73 @@ JLR_DATA = "jlr_data"
 VERSION = "2.2.4"
 
 CONF_USE_CHINA_SERVERS = "use_china_servers"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
 
 DEFAULT_SCAN_INTERVAL = 5
 MIN_SCAN_INTERVAL = 1
+DEFAULT_MAX_SCAN_INTERVAL = 60
 DEFAULT_HEATH_UPDATE_INTERVAL = 0  # Default disabled
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+# Api request timeout in seconds
+API_TIMEOUT = 15
+# Seconds before expiry to refresh access token and to retry a failed refresh
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_REFRESH_RETRY_DELAY = 60
 
-SIGNAL_STATE_UPDATED = f"{DOMAIN}.updated"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+ATTRIBUTE_CACHE_TTL = timedelta(hours=24)
+# Seconds before stale attributes are revalidated again after an attempt
+ATTRIBUTE_RETRY_INTERVAL = 3600
+
+# State updated signal per vehicle vin. Sent with a dict of changed data
+# category to changed keys.
+SIGNAL_STATE_UPDATED = f"{DOMAIN}.updated.{{}}"
+
+DATA_CATEGORY_ATTRIBUTES = "attributes"
+DATA_CATEGORY_CORE = "core"
+DATA_CATEGORY_EV = "ev"
+DATA_CATEGORY_POSITION = "position"
+DATA_CATEGORY_TRIP = "trip"
+DATA_CATEGORIES = [
+    DATA_CATEGORY_ATTRIBUTES,
+    DATA_CATEGORY_CORE,
+    DATA_CATEGORY_EV,
+    DATA_CATEGORY_POSITION,
+    DATA_CATEGORY_TRIP,
+]
+
+# Vehicle states and charging statuses polled at the scan interval. Idle
+# vehicles back off towards the max scan interval while their data is
+# unchanged. Updates due within the slack (seconds) are polled together.
+ACTIVE_VEHICLE_STATES = [
+    "KEY_INSERTED",
+    "KEY_ON_ENGINE_OFF",
+    "KEY_ON_ENGINE_ON",
+    "ENGINE_ON_REMOTE_START",
+]
+ACTIVE_CHARGING_STATUSES = ["CHARGING", "INITIALIZATION"]
+SCAN_INTERVAL_BACKOFF = 2
+SCAN_INTERVAL_SLACK = 30
+# Seconds before the position of a vehicle that has not moved is requested
+POSITION_MAX_AGE = 3600
+# Number of trips requested when syncing new trips to the trip history
+TRIP_SYNC_COUNT = 20
+# Days of trip history kept in the trip store
+TRIP_HISTORY_DAYS = 365
+
+TRIP_PERIOD_DAY = "daily"
+TRIP_PERIOD_WEEK = "weekly"
+TRIP_PERIOD_MONTH = "monthly"
+
+# Reverse geocode cache grid cell size in decimal places of latitude and
+# longitude (3 is around 100m) and number of cells kept
+GEOCODE_PRECISION = 3
+GEOCODE_CACHE_SIZE = 256
+
+# Api metrics updated signal per config entry
+SIGNAL_METRICS_UPDATED = f"{DOMAIN}.metrics.{{}}"
 
 # Conversions
 KMS_TO_MILES = 0.62137
@@ -194,8 +256,36 @@ DATA_ATTRS_WINDOW_STATUS = {
     "sunroof": "IS_SUNROOF_OPEN",
 }
 
+# Vehicle data categories to update after a service call by service code
+SERVICE_UPDATE_CATEGORIES = {
+    "VHS": DATA_CATEGORIES,
+    "RDL": [DATA_CATEGORY_CORE],
+    "RDU": [DATA_CATEGORY_CORE],
+    "ALOFF": [DATA_CATEGORY_CORE],
+    "HBLF": [],
+    "REON": [DATA_CATEGORY_CORE],
+    "REOFF": [DATA_CATEGORY_CORE],
+    "CP": [DATA_CATEGORY_EV],
+    "ECC": [DATA_CATEGORY_CORE, DATA_CATEGORY_EV],
+}
+
+# Service call monitoring. Intervals and timeout in seconds.
+SERVICE_STATUS_PENDING = ["Started", "Running"]
+SERVICE_STATUS_SUCCESS = ["Successful", "MessageDelivered"]
+SERVICE_MONITOR_MIN_INTERVAL = 2
+SERVICE_MONITOR_MAX_INTERVAL = 30
+SERVICE_MONITOR_BACKOFF = 1.5
+SERVICE_MONITOR_TIMEOUT = 300
+SERVICE_STATUS_CACHE_TTL = 600
+# Weight of latest duration in learned service durations
+SERVICE_DURATION_SMOOTHING = 0.3
+
 SERVICE_STATUS_OK = ["CLEAR", "FUNCTIONING", "NORMAL", "NORMAL_UNBLOCKED"]
 
+# Service returning all data of a vehicle. Needs service responses, so is
+# only registered on Home Assistant 2023.7 and later.
+SERVICE_GET_VEHICLE_DATA = "get_vehicle_data"
+
 JLR_SERVICES = {
     "update_health_status": {
         "function_name": "get_health_status",
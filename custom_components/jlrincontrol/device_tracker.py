@@ -3,7 +3,7 @@ import logging
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.components.device_tracker import SOURCE_TYPE_GPS
 from homeassistant.components.device_tracker.config_entry import TrackerEntity
-from .const import JLR_DATA, DOMAIN
+from .const import JLR_DATA, DOMAIN, DATA_CATEGORY_POSITION
 from .entity import JLREntity
 
 
@@ -29,6 +29,8 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
 
 class JLRDeviceTracker(JLREntity, TrackerEntity):
+    _update_categories = [DATA_CATEGORY_POSITION]
+
     def __init__(self, hass, data, vin) -> None:
         self._position = None
         self._latitude = None
@@ -57,14 +59,9 @@ class JLRDeviceTracker(JLREntity, TrackerEntity):
     def extra_state_attributes(self):
         attrs = {}
 
-        try:
-            loc_name = self._hass.async_add_exexutor_job(
-                self._data.connection.reverse_geocode,
-                (self._latitude, self._longitude),
-            )
-            attrs["location"] = loc_name.get("formattedAddress")
-        except Exception:
-            pass
+        # Address is looked up when the position is updated
+        if self._vehicle.address:
+            attrs["location"] = self._vehicle.address
         attrs["speed"] = self._position.get("speed")
         attrs["heading"] = self._position.get("heading")
 
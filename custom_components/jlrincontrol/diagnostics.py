@@ -0,0 +1,49 @@
+"""Diagnostics support for JLR InControl."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_PIN, CONF_USERNAME
+
+from .const import DOMAIN, JLR_DATA
+from .util import field_mask
+
+TO_REDACT = {
+    CONF_PASSWORD,
+    CONF_PIN,
+    CONF_USERNAME,
+    "vin",
+    "registrationNumber",
+    # Telematics device identifiers
+    "serialNumber",
+    "imei",
+    "imsi",
+    "iccid",
+    "msisdn",
+    "latitude",
+    "longitude",
+}
+
+
+def _vehicle_diagnostics(data, vin):
+    return async_redact_data(data.get_vehicle_data(vin), TO_REDACT)
+
+
+async def async_get_config_entry_diagnostics(hass, config_entry):
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN][config_entry.entry_id][JLR_DATA]
+
+    return {
+        "options": async_redact_data(dict(config_entry.options), TO_REDACT),
+        "vehicles": {
+            field_mask(vin, 3, 2): _vehicle_diagnostics(data, vin)
+            for vin in data.vehicles
+        },
+        "metrics": data.metrics.as_dict(),
+    }
+
+
+async def async_get_device_diagnostics(hass, config_entry, device):
+    """Return all attribute, status and position data of a vehicle."""
+    data = hass.data[DOMAIN][config_entry.entry_id][JLR_DATA]
+    for domain, vin in device.identifiers:
+        if domain == DOMAIN and vin in data.vehicles:
+            return _vehicle_diagnostics(data, vin)
+    return {}
@@ -8,18 +8,25 @@ from homeassistant.const import (
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity
 from homeassistant.util import dt
-from .const import DOMAIN, SIGNAL_STATE_UPDATED
+from .const import DATA_CATEGORIES, DOMAIN, SIGNAL_STATE_UPDATED
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class JLREntity(Entity):
+    # Vehicle data categories and keys this entity depends on.
+    # Keys of None updates on any change in the categories.
+    _update_categories = DATA_CATEGORIES
+    _update_keys = None
+
     def __init__(self, hass, data, vin):
         """Create a new generic JLR sensor."""
         self._hass = hass
         self._data = data
         self._vin = vin
         self._vehicle = self._data.vehicles[self._vin]
+        # Computed values by name with the data revision they were built at
+        self._memo = {}
         self._name = (
             self._vehicle.attributes.get("nickname")
             + " "
@@ -54,6 +61,10 @@ class JLREntity(Entity):
     def vehicle(self):
         return self._vehicle
 
+    @property
+    def vin(self):
+        return self._vin
+
     @property
     def unique_id(self):
         """Return the sensor's unique id."""
@@ -76,18 +87,48 @@ class JLREntity(Entity):
         return True
 
     async def async_added_to_hass(self):
-        """Subscribe for update from the hub"""
+        """Register entity and subscribe for update from the hub"""
+        entity_id = self.entity_id
+        self._data.async_register_entity(self)
+        self.async_on_remove(
+            lambda: self._data.async_unregister_entity(entity_id, self._vin)
+        )
 
-        async def async_update_state():
-            """Update sensor state."""
-            await self.async_update_ha_state(True)
+        async def async_update_state(changes):
+            """Update sensor state if data it depends on has changed."""
+            for category in self._update_categories:
+                if category not in changes:
+                    continue
+                keys = changes[category]
+                if (
+                    keys is None
+                    or self._update_keys is None
+                    or keys & self._update_keys
+                ):
+                    await self.async_update_ha_state(True)
+                    return
 
         self.async_on_remove(
             async_dispatcher_connect(
-                self._hass, SIGNAL_STATE_UPDATED, async_update_state
+                self._hass,
+                SIGNAL_STATE_UPDATED.format(self._vin),
+                async_update_state,
             )
         )
 
+    def _memoize(self, name, build):
+        """Return value built by build, rebuilt only when the vehicle data
+        in the entity's update categories has changed.
+        """
+        revision = tuple(
+            self._vehicle.revisions[category]
+            for category in self._update_categories
+        )
+        cached = self._memo.get(name)
+        if cached is None or cached[0] != revision:
+            cached = self._memo[name] = (revision, build())
+        return cached[1]
+
     def to_local_datetime(self, datetime: str):
         try:
             return dt.as_local(dt.parse_datetime(datetime))
@@ -112,6 +153,6 @@ class JLREntity(Entity):
     def get_odometer(self, vehicle):
         self.units = self.get_distance_units()
         if self.units == LENGTH_KILOMETERS:
-            return int(int(vehicle.status.get("ODOMETER_METER")) / 1000)
+            return int(vehicle.status.get_int("ODOMETER_METER", 0) / 1000)
         else:
-            return int(vehicle.status.get("ODOMETER_MILES"))
+            return vehicle.status.get_int("ODOMETER_MILES", 0)
@@ -0,0 +1,45 @@
+"""Cached reverse geocoding for JLR InControl."""
+import logging
+from collections import OrderedDict
+
+from .const import GEOCODE_CACHE_SIZE, GEOCODE_PRECISION
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JLRGeocodeCache:
+    """Addresses of recently seen positions.
+
+    Positions are grouped into grid cells by rounding latitude and
+    longitude so small gps drift reuses the cached address. The least
+    recently used cells are evicted once the cache is full.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._addresses = OrderedDict()
+
+    async def async_get_address(self, latitude, longitude):
+        """Return address of a position, or None if it cannot be found."""
+        cell = (
+            round(latitude, GEOCODE_PRECISION),
+            round(longitude, GEOCODE_PRECISION),
+        )
+        if cell in self._addresses:
+            self._addresses.move_to_end(cell)
+            return self._addresses[cell]
+
+        try:
+            result = await self._data.async_request(
+                "reverse_geocode", latitude, longitude
+            )
+        except Exception as ex:
+            _LOGGER.debug("Unable to reverse geocode. Error is {}".format(ex))
+            return None
+
+        address = result.get("formattedAddress") if result else None
+        if address:
+            self._addresses[cell] = address
+            if len(self._addresses) > GEOCODE_CACHE_SIZE:
+                self._addresses.popitem(last=False)
+        return address
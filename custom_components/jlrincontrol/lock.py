@@ -3,10 +3,10 @@ import logging
 
 # from homeassistant.const import STATE_OFF, UNIT_PERCENTAGE
 from homeassistant.components.lock import LockEntity
-from .services import JLRService
 from .const import (
     DOMAIN,
     DATA_ATTRS_DOOR_POSITION,
+    DATA_CATEGORY_CORE,
     DATA_ATTRS_DOOR_STATUS,
     JLR_DATA,
 )
@@ -21,11 +21,17 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
     for vehicle in data.vehicles:
         devices.append(JLRLock(hass, data, vehicle))
-        data.entities.extend(devices)
-        async_add_entities(devices, True)
+    async_add_entities(devices, True)
 
 
 class JLRLock(JLREntity, LockEntity):
+    _update_categories = [DATA_CATEGORY_CORE]
+    _update_keys = {
+        "DOOR_IS_ALL_DOORS_LOCKED",
+        *DATA_ATTRS_DOOR_STATUS.values(),
+        *DATA_ATTRS_DOOR_POSITION.values(),
+    }
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:car-key"
         self._sensor_name = "doors"
@@ -45,11 +51,7 @@ class JLRLock(JLREntity, LockEntity):
             kwargs["service_name"] = "lock"
             kwargs["service_code"] = "RDL"
             kwargs["pin"] = p
-            jlr_service = JLRService(
-                self._hass, self._data.config_entry, self._vin
-            )
-            await jlr_service.async_call_service(**kwargs)
-            await self._data.async_update()
+            await self._data.async_queue_service(self._vin, **kwargs)
         else:
             _LOGGER.warning("Cannot lock vehicle - pin not set in options.")
 
@@ -62,16 +64,15 @@ class JLRLock(JLREntity, LockEntity):
             kwargs["service_name"] = "unlock"
             kwargs["service_code"] = "RDU"
             kwargs["pin"] = p
-            jlr_service = JLRService(
-                self._hass, self._data.config_entry, self._vin
-            )
-            await jlr_service.async_call_service(**kwargs)
-            await self._data.async_update()
+            await self._data.async_queue_service(self._vin, **kwargs)
         else:
             _LOGGER.warning("Cannot unlock vehicle - pin not set in options.")
 
     @property
     def extra_state_attributes(self):
+        return self._memoize("attributes", self._build_attributes)
+
+    def _build_attributes(self):
         s = self._vehicle.status
         attrs = {}
         for k, v in DATA_ATTRS_DOOR_STATUS.items():
@@ -0,0 +1,108 @@
+"""Api call instrumentation for JLR InControl."""
+import time
+from contextlib import contextmanager
+
+from homeassistant.util import dt
+
+# Upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 5, 10, 30]
+
+
+class JLREndpointStats:
+    """Latency histogram, error count and last success of an endpoint."""
+
+    __slots__ = (
+        "calls",
+        "errors",
+        "total_time",
+        "max_time",
+        "histogram",
+        "last_success",
+        "last_error",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.last_success = None
+        self.last_error = None
+
+    def record(self, duration, error=None):
+        self.calls += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+        bucket = len(LATENCY_BUCKETS)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                bucket = index
+                break
+        self.histogram[bucket] += 1
+
+        if error is None:
+            self.last_success = dt.utcnow()
+        else:
+            self.errors += 1
+            self.last_error = str(error) or type(error).__name__
+
+    def as_dict(self):
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [
+            f">{LATENCY_BUCKETS[-1]}s"
+        ]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "average_time": round(self.total_time / self.calls, 3)
+            if self.calls
+            else None,
+            "max_time": round(self.max_time, 3),
+            "histogram": dict(zip(labels, self.histogram)),
+            "last_success": self.last_success.isoformat()
+            if self.last_success
+            else None,
+            "last_error": self.last_error,
+        }
+
+
+class JLRApiMetrics:
+    """Statistics of api calls by endpoint and of update cycles."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.update = JLREndpointStats()
+        self.vehicle_update_failures = 0
+        self.last_update_time = None
+
+    @contextmanager
+    def measure(self, endpoint):
+        """Record duration and result of the wrapped api call."""
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = JLREndpointStats()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as ex:
+            stats.record(time.monotonic() - start, ex)
+            raise
+        stats.record(time.monotonic() - start)
+
+    @property
+    def errors(self):
+        return sum(stats.errors for stats in self.endpoints.values())
+
+    def as_dict(self):
+        return {
+            "update": {
+                **self.update.as_dict(),
+                "last_update_time": self.last_update_time,
+                "vehicle_update_failures": self.vehicle_update_failures,
+            },
+            "endpoints": {
+                endpoint: stats.as_dict()
+                for endpoint, stats in sorted(self.endpoints.items())
+            },
+        }
@@ -0,0 +1,217 @@
+"""Vehicle data models for JLR InControl."""
+import math
+from datetime import timedelta
+
+from homeassistant.util import dt
+
+from .const import TRIP_PERIOD_DAY, TRIP_PERIOD_MONTH, TRIP_PERIOD_WEEK
+
+# Functions returning the key of the period a local datetime is in
+TRIP_PERIOD_KEYS = {
+    TRIP_PERIOD_DAY: lambda time: time.strftime("%Y-%m-%d"),
+    TRIP_PERIOD_WEEK: lambda time: "{}-W{:02d}".format(*time.isocalendar()[:2]),
+    TRIP_PERIOD_MONTH: lambda time: time.strftime("%Y-%m"),
+}
+# Number of most recent periods of each type kept
+TRIP_PERIODS_KEPT = 2
+
+
+def trip_periods_start(now=None):
+    """Return local start of the oldest kept period of any type.
+
+    This is the start of the previous month, as no kept day or week
+    starts before it.
+    """
+    month = dt.start_of_local_day(now).replace(day=1)
+    return (month - timedelta(days=1)).replace(day=1)
+
+
+def parse_number(value):
+    """Return value as an int or float, or None if it is not numeric."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+class JLRVehicleStatus:
+    """Core or ev status values of a vehicle.
+
+    Updated in place on each poll. Numeric values are parsed once when
+    they change so entities read them without converting strings.
+    """
+
+    __slots__ = ("_values", "_numbers")
+
+    def __init__(self, values=None):
+        self._values = {}
+        self._numbers = {}
+        if values:
+            self.update(values.items())
+
+    def update(self, items):
+        """Set values from (key, value) pairs and return changed keys.
+
+        Keys not in items are removed.
+        """
+        changed = set()
+        seen = set()
+        for key, value in items:
+            seen.add(key)
+            if key in self._values and self._values[key] == value:
+                continue
+            self._values[key] = value
+            number = parse_number(value)
+            if number is None:
+                self._numbers.pop(key, None)
+            else:
+                self._numbers[key] = number
+            changed.add(key)
+
+        for key in self._values.keys() - seen:
+            del self._values[key]
+            self._numbers.pop(key, None)
+            changed.add(key)
+
+        return changed
+
+    def get(self, key, default=None):
+        """Return raw value of key."""
+        return self._values.get(key, default)
+
+    def get_number(self, key, default=None):
+        """Return parsed numeric value of key."""
+        return self._numbers.get(key, default)
+
+    def get_int(self, key, default=None):
+        """Return numeric value of key as an int."""
+        number = self._numbers.get(key)
+        return default if number is None else int(number)
+
+    def items(self):
+        return self._values.items()
+
+    def as_dict(self):
+        return dict(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+
+class JLRTripTotals:
+    """Running totals of the trips in a period."""
+
+    __slots__ = (
+        "trips",
+        "distance",
+        "consumed",
+        "consumption_distance",
+        "eco_score_total",
+        "eco_score_trips",
+    )
+
+    def __init__(self):
+        self.trips = 0
+        # Distance in meters and energy (kWh) or fuel (l) consumed
+        self.distance = 0
+        self.consumed = 0.0
+        # Distance of trips with a consumption figure
+        self.consumption_distance = 0
+        self.eco_score_total = 0.0
+        self.eco_score_trips = 0
+
+    def add(self, record, electric):
+        """Add a trip record. Consumption is per 100km."""
+        distance = parse_number(record.get("distance")) or 0
+        self.trips += 1
+        self.distance += distance
+
+        consumption = parse_number(
+            record.get(
+                "averageEnergyConsumption"
+                if electric
+                else "averageFuelConsumption"
+            )
+        )
+        if consumption is not None:
+            self.consumed += consumption * distance / 100000
+            self.consumption_distance += distance
+
+        eco_score = parse_number(record.get("ecoScore"))
+        if eco_score is not None:
+            self.eco_score_total += eco_score
+            self.eco_score_trips += 1
+
+    @property
+    def average_consumption(self):
+        """Return consumption per 100km or None if not known."""
+        if not self.consumption_distance:
+            return None
+        return self.consumed / self.consumption_distance * 100000
+
+    @property
+    def eco_score(self):
+        if not self.eco_score_trips:
+            return None
+        return self.eco_score_total / self.eco_score_trips
+
+
+class JLRTripStatistics:
+    """Trip totals of a vehicle by day, week and month.
+
+    Totals are updated as trips are added so nothing is rescanned.
+    Periods are by local start time of the trip.
+    """
+
+    def __init__(self, electric):
+        self.electric = electric
+        self.periods = {period: {} for period in TRIP_PERIOD_KEYS}
+
+    def add(self, record):
+        start = dt.parse_datetime(record.get("start") or "")
+        if start is None:
+            return
+        start = dt.as_local(start)
+        for period, period_key in TRIP_PERIOD_KEYS.items():
+            totals = self.periods[period]
+            key = period_key(start)
+            if key not in totals:
+                totals[key] = JLRTripTotals()
+                while len(totals) > TRIP_PERIODS_KEPT:
+                    del totals[min(totals)]
+            if key in totals:
+                totals[key].add(record, self.electric)
+
+    def add_records(self, records):
+        """Add trip records sorted by start time.
+
+        Records before the oldest kept period are skipped without parsing
+        by walking back from the newest record.
+        """
+        start = trip_periods_start()
+        index = len(records)
+        while index:
+            time = dt.parse_datetime(records[index - 1].get("start") or "")
+            if time is None or dt.as_local(time) < start:
+                break
+            index -= 1
+        for record in records[index:]:
+            self.add(record)
+
+    def get(self, period):
+        """Return totals of the current period or None if no trips."""
+        return self.periods[period].get(TRIP_PERIOD_KEYS[period](dt.now()))
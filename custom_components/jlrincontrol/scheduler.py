@@ -0,0 +1,138 @@
+"""Adaptive vehicle update scheduling for JLR InControl."""
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    ACTIVE_CHARGING_STATUSES,
+    ACTIVE_VEHICLE_STATES,
+    SCAN_INTERVAL_BACKOFF,
+    SCAN_INTERVAL_SLACK,
+)
+from .util import field_mask
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JLRUpdateScheduler:
+    """Schedule vehicle updates at intervals adapted to vehicle state.
+
+    Active or charging vehicles, and vehicles whose data has just changed,
+    are polled at the min interval. Otherwise the interval of a vehicle
+    grows by the backoff factor on every update up to the max interval.
+    A single timer fires at the earliest due time and polls all vehicles
+    due by then.
+    """
+
+    def __init__(self, hass, data, min_interval, max_interval):
+        self.hass = hass
+        self._data = data
+        # Intervals in seconds
+        self.min_interval = min_interval * 60
+        self.max_interval = max(max_interval, min_interval) * 60
+        self.intervals = {}
+        self.next_update = {}
+        self._last_updated_time = {}
+        self._unsub = None
+        self._update_task = None
+        self._stopped = False
+
+    def _get_interval(self, vin):
+        vehicle = self._data.vehicles[vin]
+        status = vehicle.status or {}
+        updated_time = status.get("lastUpdatedTime")
+        previous_time = self._last_updated_time.get(vin)
+        self._last_updated_time[vin] = updated_time
+
+        if (
+            status.get("VEHICLE_STATE_TYPE") in ACTIVE_VEHICLE_STATES
+            or (vehicle.status_ev or {}).get("EV_CHARGING_STATUS")
+            in ACTIVE_CHARGING_STATUSES
+        ):
+            return self.min_interval
+
+        if vin not in self.intervals or updated_time != previous_time:
+            return self.min_interval
+
+        return min(
+            self.intervals[vin] * SCAN_INTERVAL_BACKOFF, self.max_interval
+        )
+
+    @callback
+    def async_vehicle_updated(self, vin, success=True):
+        """Set next update time of a vehicle after an update.
+
+        A failed update keeps the current interval.
+        """
+        if success or vin not in self.intervals:
+            self.intervals[vin] = self._get_interval(vin)
+        self.next_update[vin] = time.monotonic() + self.intervals[vin]
+        _LOGGER.debug(
+            "Next update for {} in {} seconds".format(
+                field_mask(vin, 3, 2), int(self.intervals[vin])
+            )
+        )
+
+    @callback
+    def async_schedule(self):
+        """Schedule the timer for the earliest due vehicle update.
+
+        Not done while a scheduled update is running as it reschedules
+        when finished.
+        """
+        if self._stopped or (
+            self._update_task and not self._update_task.done()
+        ):
+            return
+        self._async_cancel_timer()
+        if not self.next_update:
+            return
+        delay = min(self.next_update.values()) - time.monotonic()
+        self._unsub = async_call_later(
+            self.hass, max(delay, 0), self._async_update_due
+        )
+
+    @callback
+    def _async_update_due(self, *args):
+        self._unsub = None
+        due_time = time.monotonic() + SCAN_INTERVAL_SLACK
+        vins = [
+            vin
+            for vin in self._data.vehicles
+            if self.next_update.get(vin, 0) <= due_time
+        ]
+        if not vins:
+            self.async_schedule()
+            return
+        self._update_task = self.hass.async_create_task(
+            self._async_update(vins)
+        )
+
+    async def _async_update(self, vins):
+        try:
+            await self._data.async_update(vins)
+        finally:
+            # A vehicle whose update did not set its next update time is
+            # retried after its interval rather than straight away
+            now = time.monotonic()
+            for vin in vins:
+                if self.next_update.get(vin, 0) <= now:
+                    self.async_vehicle_updated(vin, False)
+            self._update_task = None
+            self.async_schedule()
+
+    @callback
+    def _async_cancel_timer(self):
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def async_stop(self):
+        """Stop scheduled updates."""
+        self._stopped = True
+        self._async_cancel_timer()
+        if self._update_task:
+            self._update_task.cancel()
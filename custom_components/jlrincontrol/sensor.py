@@ -10,7 +10,11 @@ from homeassistant.const import (
     PRESSURE_PA,
     PRESSURE_BAR,
 )
+from homeassistant.core import callback
 from homeassistant.helpers import icon
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity, EntityCategory
+from homeassistant.helpers.event import async_track_time_change
 from homeassistant.util import dt, unit_conversion
 from .const import (
     DOMAIN,
@@ -27,6 +31,15 @@ from .const import (
     JLR_CHARGE_STATUS_TO_HA,
     JLR_DATA,
     SERVICE_STATUS_OK,
+    SIGNAL_METRICS_UPDATED,
+    DATA_CATEGORY_ATTRIBUTES,
+    DATA_CATEGORY_CORE,
+    DATA_CATEGORY_EV,
+    DATA_CATEGORY_POSITION,
+    DATA_CATEGORY_TRIP,
+    TRIP_PERIOD_DAY,
+    TRIP_PERIOD_MONTH,
+    TRIP_PERIOD_WEEK,
 )
 from .entity import JLREntity
 from .config_flow import CONF_ALL_DATA_SENSOR
@@ -65,16 +78,30 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         # Show last trip sensor is privacy mode off and data exists
         if data.vehicles[vehicle].last_trip:
             devices.append(JLRVehicleLastTripSensor(hass, data, vehicle))
+            for period in [TRIP_PERIOD_DAY, TRIP_PERIOD_WEEK, TRIP_PERIOD_MONTH]:
+                devices.append(
+                    JLRVehicleTripStatisticsSensor(hass, data, vehicle, period)
+                )
         else:
             _LOGGER.debug(
                 f"Not loading Last Trip sensor for {data.vehicles[vehicle].attributes.get('nickname')} due to privacy mode or no data"
             )
 
-    data.entities.extend(devices)
+    # Api diagnostic sensors for the account
+    devices.append(JLRUpdateDurationSensor(data))
+    devices.append(JLRApiErrorsSensor(data))
+
     async_add_entities(devices, True)
 
 
 class JLRVehicleAllDataSensor(JLREntity):
+    _update_categories = [
+        DATA_CATEGORY_ATTRIBUTES,
+        DATA_CATEGORY_CORE,
+        DATA_CATEGORY_EV,
+        DATA_CATEGORY_POSITION,
+    ]
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:cloud"
         self._sensor_name = "all info"
@@ -91,42 +118,22 @@ class JLRVehicleAllDataSensor(JLREntity):
 
     @property
     def extra_state_attributes(self):
-        attrs = {}
-
-        # Vehicle Attributes
-        attributes = self._vehicle.attributes.copy()
-
-        # Remove Capabilities
-        if attributes.get("capabilities"):
-            del attributes["capabilities"]
-
-        # Remove Services
-        if attributes.get("availableServices"):
-            del attributes["availableServices"]
-
-        attrs["attributes"] = dict(sorted(attributes.items()))
-
-        # Vehicle Status
-        s = {}
-        for k, v in self._vehicle.status.copy().items():
-            k = k[0].lower() + k.title().replace("_", "")[1:]
-            s[k] = v
-        attrs["core status"] = dict(sorted(s.items()))
+        # Full data is too large to record with every state change so is
+        # available from the vehicle device diagnostics
+        return self._memoize("attributes", self._build_attributes)
 
+    def _build_attributes(self):
+        attrs = {}
+        attrs["Core Status Items"] = len(self._vehicle.status)
         if self._engine_type in [FUEL_TYPE_BATTERY, FUEL_TYPE_HYBRID]:
-            s = {}
-            for k, v in self._vehicle.status_ev.copy().items():
-                k = k[0].lower() + k.title().replace("_", "")[1:]
-                s[k] = v
-            attrs["ev status"] = dict(sorted(s.items()))
-
-        # Vehicle Position
-        attrs["position"] = dict(sorted(self._vehicle.position.items()))
-
+            attrs["EV Status Items"] = len(self._vehicle.status_ev)
+        attrs["Position"] = bool(self._vehicle.position)
         return attrs
 
 
 class JLRVehicleSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_ATTRIBUTES, DATA_CATEGORY_CORE]
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:car-info"
         self._sensor_name = "info"
@@ -155,10 +162,19 @@ class JLRVehicleSensor(JLREntity):
             )
             attrs["Last Contacted"] = last_contacted
             attrs["Last Contacted Age"] = dt.get_age(last_contacted) + " ago"
+
+        # Data restored on start up and not yet updated from the api
+        attrs["Data Stale"] = self._vehicle.stale
         return attrs
 
 
 class JLRVehicleTyreSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_CORE]
+    _update_keys = {
+        *DATA_ATTRS_TYRE_STATUS.values(),
+        *DATA_ATTRS_TYRE_PRESSURE.values(),
+    }
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:car-tire-alert"
         self._sensor_name = "tyres"
@@ -167,6 +183,9 @@ class JLRVehicleTyreSensor(JLREntity):
 
     @property
     def state(self):
+        return self._memoize("state", self._build_state)
+
+    def _build_state(self):
         # Convert to list of values from dict
         if all(
             [
@@ -180,6 +199,9 @@ class JLRVehicleTyreSensor(JLREntity):
 
     @property
     def extra_state_attributes(self):
+        return self._memoize("attributes", self._build_attributes)
+
+    def _build_attributes(self):
         s = self._vehicle.status
         attrs = {}
 
@@ -193,8 +215,8 @@ class JLRVehicleTyreSensor(JLREntity):
         # Pressures
         for k, v in DATA_ATTRS_TYRE_PRESSURE.items():
 
-            if s.get(v):
-                tyre_pressure = int(s.get(v))
+            tyre_pressure = s.get_int(v)
+            if tyre_pressure is not None:
                 # Some vehicles send in kPa*10, others in kPa. Ensure in kPa
                 if tyre_pressure > 1000:
                     tyre_pressure = tyre_pressure / 10
@@ -218,6 +240,9 @@ class JLRVehicleTyreSensor(JLREntity):
 
 
 class JLRVehicleWindowSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_ATTRIBUTES, DATA_CATEGORY_CORE]
+    _update_keys = {*DATA_ATTRS_WINDOW_STATUS.values()}
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:car-door"
         self._sensor_name = "windows"
@@ -256,6 +281,9 @@ class JLRVehicleWindowSensor(JLREntity):
 
 
 class JLRVehicleAlarmSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_CORE]
+    _update_keys = {"THEFT_ALARM_STATUS"}
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:security"
         self._sensor_name = "alarm"
@@ -277,6 +305,12 @@ class JLRVehicleAlarmSensor(JLREntity):
 
 
 class JLRVehicleServiceSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_CORE]
+    _update_keys = {
+        *DATA_ATTRS_SERVICE_STATUS.values(),
+        *DATA_ATTRS_SERVICE_INFO.values(),
+    }
+
     def __init__(self, hass, data, vin):
         self._icon = "mdi:wrench"
         self._sensor_name = "service info"
@@ -312,6 +346,17 @@ class JLRVehicleServiceSensor(JLREntity):
 
 
 class JLRVehicleRangeSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_CORE, DATA_CATEGORY_EV]
+    _update_keys = {
+        "DISTANCE_TO_EMPTY_FUEL",
+        "FUEL_LEVEL_PERC",
+        "EV_STATE_OF_CHARGE",
+        "EV_RANGE_ON_BATTERY_KM",
+        "EV_RANGE_ON_BATTERY_MILES",
+        "EV_PHEV_RANGE_COMBINED_KM",
+        "EV_PHEV_RANGE_COMBINED_MILES",
+    }
+
     def __init__(self, hass, data, vin):
         self._sensor_name = "range"
         super().__init__(hass, data, vin)
@@ -324,23 +369,26 @@ class JLRVehicleRangeSensor(JLREntity):
 
     @property
     def state(self):
+        return self._memoize("state", self._build_state)
+
+    def _build_state(self):
         # Has battery
         if self._engine_type == FUEL_TYPE_BATTERY:
             return (
-                self._vehicle.status_ev.get("EV_RANGE_ON_BATTERY_KM", "0") 
+                self._vehicle.status_ev.get_int("EV_RANGE_ON_BATTERY_KM", 0)
                 if self._units == LENGTH_KILOMETERS
-                else self._vehicle.status_ev.get("EV_RANGE_ON_BATTERY_MILES", "0")
+                else self._vehicle.status_ev.get_int("EV_RANGE_ON_BATTERY_MILES", 0)
             )
         if self._engine_type == FUEL_TYPE_HYBRID:
             return (
-                self._vehicle.status_ev.get("EV_PHEV_RANGE_COMBINED_KM", "0")
-                 if self._units == LENGTH_KILOMETERS
-                else self._vehicle.status_ev.get("EV_PHEV_RANGE_COMBINED_MILES", "0")
+                self._vehicle.status_ev.get_int("EV_PHEV_RANGE_COMBINED_KM", 0)
+                if self._units == LENGTH_KILOMETERS
+                else self._vehicle.status_ev.get_int("EV_PHEV_RANGE_COMBINED_MILES", 0)
             )
         # Fuel only
         return round(
             unit_conversion.DistanceConverter.convert(
-                int(self._vehicle.status.get("DISTANCE_TO_EMPTY_FUEL")),
+                self._vehicle.status.get_int("DISTANCE_TO_EMPTY_FUEL", 0),
                 LENGTH_KILOMETERS,
                 self._units,
             )
@@ -352,6 +400,9 @@ class JLRVehicleRangeSensor(JLREntity):
 
     @property
     def extra_state_attributes(self):
+        return self._memoize("attributes", self._build_attributes)
+
+    def _build_attributes(self):
         attrs = {}
         attrs["Fuel Type"] = self._fuel
 
@@ -369,22 +420,36 @@ class JLRVehicleRangeSensor(JLREntity):
         # If hybrid
         if self._engine_type == FUEL_TYPE_HYBRID:
             attrs["Fuel Range"] = round(unit_conversion.DistanceConverter.convert(
-                int(self._vehicle.status.get("DISTANCE_TO_EMPTY_FUEL")),
+                self._vehicle.status.get_int("DISTANCE_TO_EMPTY_FUEL", 0),
                 LENGTH_KILOMETERS,
                 self._units,
                 )
             )
 
             attrs["Battery Range"] = (
-                self._vehicle.status_ev.get("EV_RANGE_ON_BATTERY_KM", "0") 
+                self._vehicle.status_ev.get_int("EV_RANGE_ON_BATTERY_KM", 0)
                 if self._units == LENGTH_KILOMETERS
-                else self._vehicle.status_ev.get("EV_RANGE_ON_BATTERY_MILES", "0")
+                else self._vehicle.status_ev.get_int("EV_RANGE_ON_BATTERY_MILES", 0)
             )
         
         return attrs
 
 
 class JLREVBatterySensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_EV]
+    _update_keys = {
+        "EV_STATE_OF_CHARGE",
+        "EV_CHARGING_STATUS",
+        "EV_CHARGING_METHOD",
+        "EV_ONE_OFF_MAX_SOC_CHARGE_SETTING_CHOICE",
+        "EV_PERMANENT_MAX_SOC_CHARGE_SETTING_CHOICE",
+        "EV_MINUTES_TO_FULLY_CHARGED",
+        "EV_CHARGING_RATE_KM_PER_HOUR",
+        "EV_CHARGING_RATE_MILES_PER_HOUR",
+        "EV_CHARGING_RATE_SOC_PER_HOUR",
+        "EV_ENERGY_CONSUMED_LAST_CHARGE_KWH",
+    }
+
     def __init__(self, hass, data, vin):
         self._sensor_name = "battery"
         super().__init__(hass, data, vin)
@@ -393,7 +458,7 @@ class JLREVBatterySensor(JLREntity):
 
     @property
     def state(self):
-        return self._vehicle.status_ev.get("EV_STATE_OF_CHARGE", 0)
+        return self._vehicle.status_ev.get_int("EV_STATE_OF_CHARGE", 0)
 
     @property
     def device_class(self):
@@ -408,12 +473,15 @@ class JLREVBatterySensor(JLREntity):
     @property
     def icon(self):
         return icon.icon_for_battery_level(
-            int(self._vehicle.status_ev.get("EV_STATE_OF_CHARGE", 0)),
+            self._vehicle.status_ev.get_int("EV_STATE_OF_CHARGE", 0),
             self._charging_state,
         )
 
     @property
     def extra_state_attributes(self):
+        return self._memoize("attributes", self._build_attributes)
+
+    def _build_attributes(self):
         attrs = {}
         units = "KM" if self._units == LENGTH_KILOMETERS else "MILES"
         s = self._vehicle.status_ev
@@ -467,13 +535,15 @@ class JLREVBatterySensor(JLREntity):
 
         # Last Charge Amount
         attrs["Last Charge Energy (kWh)"] = round(
-            int(s.get("EV_ENERGY_CONSUMED_LAST_CHARGE_KWH", 0)) / 10, 1
+            s.get_int("EV_ENERGY_CONSUMED_LAST_CHARGE_KWH", 0) / 10, 1
         )
 
         return attrs
 
 
 class JLRVehicleLastTripSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_TRIP]
+
     def __init__(self, hass, data, vin):
         self._sensor_name = "last trip"
         super().__init__(hass, data, vin)
@@ -482,6 +552,9 @@ class JLRVehicleLastTripSensor(JLREntity):
 
     @property
     def state(self):
+        return self._memoize("state", self._build_state)
+
+    def _build_state(self):
         if self._vehicle.last_trip and self._vehicle.last_trip.get(
             "tripDetails"
         ):
@@ -505,6 +578,9 @@ class JLRVehicleLastTripSensor(JLREntity):
 
     @property
     def extra_state_attributes(self):
+        return self._memoize("attributes", self._build_attributes)
+
+    def _build_attributes(self):
         attrs = {}
         if self._vehicle.last_trip:
             t = self._vehicle.last_trip.get("tripDetails")
@@ -557,7 +633,75 @@ class JLRVehicleLastTripSensor(JLREntity):
             return attrs
 
 
+class JLRVehicleTripStatisticsSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_TRIP]
+
+    def __init__(self, hass, data, vin, period):
+        self._sensor_name = f"{period} trips"
+        self._period = period
+        super().__init__(hass, data, vin)
+        self._units = self.get_distance_units()
+        self._icon = "mdi:map-marker-distance"
+        self._statistics = self._data.trip_statistics[vin]
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+
+        # Totals are of the current period so update when a new day starts
+        @callback
+        def async_period_changed(now):
+            self.async_write_ha_state()
+
+        self.async_on_remove(
+            async_track_time_change(
+                self._hass, async_period_changed, hour=0, minute=0, second=0
+            )
+        )
+
+    @property
+    def state(self):
+        totals = self._statistics.get(self._period)
+        return round(
+            unit_conversion.DistanceConverter.convert(
+                totals.distance if totals else 0, LENGTH_METERS, self._units,
+            )
+        )
+
+    @property
+    def unit_of_measurement(self):
+        return self._units
+
+    @property
+    def extra_state_attributes(self):
+        totals = self._statistics.get(self._period)
+        attrs = {}
+        attrs["trips"] = totals.trips if totals else 0
+
+        if self._fuel == FUEL_TYPE_BATTERY:
+            attrs["energy_used"] = round(totals.consumed, 1) if totals else 0
+        else:
+            attrs["fuel_used"] = round(totals.consumed, 1) if totals else 0
+
+        average_consumption = totals.average_consumption if totals else None
+        if average_consumption is not None:
+            if (
+                self._fuel != FUEL_TYPE_BATTERY
+                and self._units != LENGTH_KILOMETERS
+            ):
+                average_consumption = average_consumption * 2.35215
+            attrs["average_consumption"] = round(average_consumption, 1)
+
+        eco_score = totals.eco_score if totals else None
+        if eco_score is not None:
+            attrs["eco_score"] = round(eco_score)
+
+        return attrs
+
+
 class JLRVehicleStatusSensor(JLREntity):
+    _update_categories = [DATA_CATEGORY_CORE]
+    _update_keys = {"VEHICLE_STATE_TYPE"}
+
     def __init__(self, hass, data, vin):
         self._sensor_name = "status"
         super().__init__(hass, data, vin)
@@ -576,3 +720,78 @@ class JLRVehicleStatusSensor(JLREntity):
     def extra_state_attributes(self):
         attrs = {}
         return attrs
+
+
+class JLRApiMetricsSensor(Entity):
+    """Base for diagnostic sensors of api metrics for a config entry."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+
+    def __init__(self, data, sensor_name):
+        self._data = data
+        self._metrics = data.metrics
+        self._attr_name = f"JLR InControl {sensor_name.title()}"
+        self._attr_unique_id = "{}-{}".format(
+            data.config_entry.entry_id, sensor_name.replace(" ", "-")
+        )
+
+    async def async_added_to_hass(self):
+        @callback
+        def async_update_state():
+            self.async_write_ha_state()
+
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_METRICS_UPDATED.format(self._data.config_entry.entry_id),
+                async_update_state,
+            )
+        )
+
+
+class JLRUpdateDurationSensor(JLRApiMetricsSensor):
+    _attr_icon = "mdi:timer-outline"
+    _attr_unit_of_measurement = "s"
+
+    def __init__(self, data):
+        super().__init__(data, "update duration")
+
+    @property
+    def state(self):
+        return self._metrics.last_update_time
+
+    @property
+    def extra_state_attributes(self):
+        # Full metrics are in the config entry diagnostics
+        update = self._metrics.update
+        return {
+            "Updates": update.calls,
+            "Failed Updates": update.errors,
+            "Failed Vehicle Updates": self._metrics.vehicle_update_failures,
+            "Max Duration": round(update.max_time, 3),
+        }
+
+
+class JLRApiErrorsSensor(JLRApiMetricsSensor):
+    _attr_icon = "mdi:api"
+
+    def __init__(self, data):
+        super().__init__(data, "api errors")
+
+    @property
+    def state(self):
+        return self._metrics.errors
+
+    @property
+    def extra_state_attributes(self):
+        # Full metrics are in the config entry diagnostics
+        requests = sum(
+            stats.calls for stats in self._metrics.endpoints.values()
+        )
+        return {
+            "Requests": requests,
+            "Error Rate": round(self._metrics.errors / requests * 100, 1)
+            if requests
+            else 0,
+        }
@@ -1,15 +1,107 @@
 import inspect
 import logging
 import asyncio
+import time
+from collections import deque
 from urllib import error
 from functools import partial
 
-from .const import DOMAIN, JLR_DATA
+from homeassistant.core import callback
+
+from .const import (
+    DOMAIN,
+    JLR_DATA,
+    SERVICE_MONITOR_BACKOFF,
+    SERVICE_MONITOR_MAX_INTERVAL,
+    SERVICE_MONITOR_TIMEOUT,
+    SERVICE_STATUS_CACHE_TTL,
+    SERVICE_STATUS_PENDING,
+    SERVICE_STATUS_SUCCESS,
+)
 from .util import convert_temp_value, field_mask
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class JLRCommandQueue:
+    """Run service calls to a vehicle one at a time.
+
+    Calls are run in the order requested. An identical call to one already
+    waiting in the queue is merged with it and shares its result.
+    """
+
+    def __init__(self, data, vin):
+        self.data = data
+        self.vin = vin
+        self._pending = deque()
+        self._task = None
+
+    async def async_call_service(self, refresh=True, **kwargs):
+        """Queue service call and return its result.
+
+        If refresh is set, vehicle data the service affects is updated once
+        the call completes.
+        """
+        key = (
+            refresh,
+            tuple(
+                sorted(
+                    (k, str(v)) for k, v in kwargs.items() if k != "entity_id"
+                )
+            ),
+        )
+
+        for pending_key, _, future in self._pending:
+            if pending_key == key:
+                _LOGGER.debug(
+                    "Service {} already queued for vehicle {}. ".format(
+                        kwargs.get("service_name"), field_mask(self.vin, 3, 2)
+                    )
+                    + "Merging requests."
+                )
+                return await asyncio.shield(future)
+
+        future = self.data.hass.loop.create_future()
+        self._pending.append((key, kwargs, future))
+
+        if self._task is None or self._task.done():
+            self._task = self.data.hass.async_create_task(
+                self._async_process_queue()
+            )
+        return await asyncio.shield(future)
+
+    async def _async_process_queue(self):
+        while self._pending:
+            key, kwargs, future = self._pending.popleft()
+            try:
+                jlr_service = JLRService(
+                    self.data.hass, self.data.config_entry, self.vin
+                )
+                result = await jlr_service.async_call_service(**kwargs)
+                if key[0]:
+                    await self.data.async_update_after_service(
+                        self.vin, kwargs.get("service_code")
+                    )
+            except Exception as ex:
+                if not future.done():
+                    future.set_exception(ex)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                # Cancelled while running, so the caller is not left waiting
+                if not future.done():
+                    future.cancel()
+
+    @callback
+    def async_cancel(self):
+        """Cancel running and pending service calls."""
+        while self._pending:
+            self._pending.popleft()[2].cancel()
+        if self._task:
+            self._task.cancel()
+
+
 class JLRService:
     def __init__(self, hass, config_entry, vin):
         self.hass = hass
@@ -74,7 +166,7 @@ class JLRService:
 
             # Call service
             try:
-                status = await self.hass.async_add_executor_job(
+                status = await self.data.async_add_job(
                     partial(service, **service_kwargs)
                 )
                 _LOGGER.info(
@@ -135,76 +227,137 @@ class JLRService:
 
     async def async_get_services(self):
         """Check for any exisitng queued service calls to vehicle"""
-        services = await self.hass.async_add_executor_job(
-            self.vehicle.get_services
+        services = await self.data.async_request("get_services", self.vin)
+        if not services or not services.get("services"):
+            return False
+
+        # Check all queued services at once to see if any are an unfinished
+        # call of this service
+        # TODO: need to test for equivalents like RDL and RDU
+        service_ids = [
+            service.replace("/vehicles/{}/services/".format(self.vin), "")
+            for service in services.get("services")
+        ]
+        statuses = await asyncio.gather(
+            *[
+                self.async_get_cached_service_status(service_id)
+                for service_id in service_ids
+            ],
+            return_exceptions=True,
         )
-        if services:
-            services = services.get("services")
-            # Check if duplicate
-            for service in services:
-                service_id = service.replace(
-                    "/vehicles/{}/services/".format(self.vin), ""
-                )
-                # Check service to see if matched to this service call
-                # TODO: need to test for equivalents like RDL and RDU
-                try:
-                    status = await self.hass.async_add_executor_job(
-                        partial(self.vehicle.get_service_status, service_id)
-                    )
-                    if status:
-                        if status.get("serviceType") == self.service_code:
-                            return True
-                except Exception:
-                    pass
 
-                return False
+        for status in statuses:
+            if isinstance(status, Exception) or not status:
+                continue
+            if (
+                status.get("serviceType") == self.service_code
+                and status.get("status") in SERVICE_STATUS_PENDING
+            ):
+                return True
+        return False
 
-        else:
-            return False
+    async def async_get_cached_service_status(self, service_id):
+        """Get status of service call, cached once it has finished"""
+        cache = self.data.service_status_cache
+        cached = cache.get(service_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        status = await self.async_check_service_status(service_id)
+        if status and status.get("status") not in SERVICE_STATUS_PENDING:
+            now = time.monotonic()
+            for expired in [k for k, v in cache.items() if v[0] <= now]:
+                del cache[expired]
+            cache[service_id] = (
+                now + SERVICE_STATUS_CACHE_TTL,
+                status,
+            )
+        return status
 
     async def async_check_service_status(self, service_id):
         """Get status of current service call"""
-        return await self.hass.async_add_executor_job(
-            self.vehicle.get_service_status, service_id
+        return await self.data.async_request(
+            "get_service_status", self.vin, service_id
         )
 
     async def async_monitor_service_call(self, service_id):
-        result = await self.async_check_service_status(service_id)
+        """Poll service status until it completes, fails or times out.
+
+        Checks start fast, at a rate learned from previous calls of the
+        same service code, and back off exponentially to a max interval.
+        """
+        start = time.monotonic()
+        interval = self.data.get_service_check_interval(self.service_code)
+        self.data.service_monitors.add(asyncio.current_task())
+
+        try:
+            result = await self.async_check_service_status(service_id)
+            status = result.get("status") if result else None
+
+            while status in SERVICE_STATUS_PENDING:
+                elapsed = time.monotonic() - start
+                if elapsed >= SERVICE_MONITOR_TIMEOUT:
+                    _LOGGER.warning(
+                        "Service call ({}) to vehicle {} ".format(
+                            self.service_name, self.nickname
+                        )
+                        + "did not complete within {} seconds.".format(
+                            SERVICE_MONITOR_TIMEOUT
+                        )
+                    )
+                    return status
 
-        if result:
-            status = result.get("status")
-            while status and status in ["Started","Running"]:
                 _LOGGER.info(
                     "Checking for {} service call result status.  Currently {}.".format(
                         self.service_name,
                         status
                     )
                 )
-                await asyncio.sleep(5)
+                await asyncio.sleep(
+                    min(interval, SERVICE_MONITOR_TIMEOUT - elapsed)
+                )
+                interval = min(
+                    interval * SERVICE_MONITOR_BACKOFF,
+                    SERVICE_MONITOR_MAX_INTERVAL,
+                )
                 result = await self.async_check_service_status(service_id)
-                status = result.get("status")
-            if status and status in ["Successful", "MessageDelivered"]:
-                _LOGGER.info(
-                    "Service call ({}) to vehicle {} was successful".format(
-                        self.service_name, self.nickname
-                    )
+                status = result.get("status") if result else None
+        except asyncio.CancelledError:
+            _LOGGER.info(
+                "Monitoring of service call ({}) to vehicle {} cancelled".format(
+                    self.service_name, self.nickname
                 )
-                return "Successful"
-            else:
-                # Anonymise data in log output
-                result["vehicleId"] = field_mask(result["vehicleId"], 3, 2)
-                result["customerServiceId"] = field_mask(result["customerServiceId"], 11, 9)
+            )
+            raise
+        finally:
+            self.data.service_monitors.discard(asyncio.current_task())
 
-                _LOGGER.error(
-                    "JLR InControl service call ({}) to vehicle {} ".format(
-                        self.service_name, self.nickname,
-                    )
-                    + "failed due to {}.".format(
-                        result.get("failureReason")
-                    )
-                )
+        if not result:
+            return None
 
-                _LOGGER.debug("Full status return is {}.".format(result))
-            return status
+        if status in SERVICE_STATUS_SUCCESS:
+            self.data.record_service_duration(
+                self.service_code, time.monotonic() - start
+            )
+            _LOGGER.info(
+                "Service call ({}) to vehicle {} was successful".format(
+                    self.service_name, self.nickname
+                )
+            )
+            return "Successful"
         else:
-            return None
+            # Anonymise data in log output
+            result["vehicleId"] = field_mask(result["vehicleId"], 3, 2)
+            result["customerServiceId"] = field_mask(result["customerServiceId"], 11, 9)
+
+            _LOGGER.error(
+                "JLR InControl service call ({}) to vehicle {} ".format(
+                    self.service_name, self.nickname,
+                )
+                + "failed due to {}.".format(
+                    result.get("failureReason")
+                )
+            )
+
+            _LOGGER.debug("Full status return is {}.".format(result))
+        return status
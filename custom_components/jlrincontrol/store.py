@@ -0,0 +1,278 @@
+"""Persistent storage for JLR InControl data."""
+import asyncio
+import json
+import logging
+import os
+from datetime import timedelta
+
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.util import dt
+
+from .const import (
+    ATTRIBUTE_CACHE_TTL,
+    DOMAIN,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    TRIP_HISTORY_DAYS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JLRTokenStore:
+    """Device id and refresh token of the api connection."""
+
+    def __init__(self, hass, entry_id):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.token")
+
+    async def async_load(self):
+        try:
+            return await self._store.async_load() or {}
+        except Exception as ex:
+            _LOGGER.debug("Unable to load token. Error is {}".format(ex))
+            return {}
+
+    async def async_save(self, device_id, refresh_token):
+        await self._store.async_save(
+            {"device_id": device_id, "refresh_token": refresh_token}
+        )
+
+    async def async_remove(self):
+        await self._store.async_remove()
+
+
+class JLRVehicleStore:
+    """Base for data persisted per vehicle, keyed by vin."""
+
+    def __init__(self, hass, entry_id, key):
+        self._store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.{key}"
+        )
+        self._data = {}
+
+    async def async_load(self):
+        try:
+            self._data = await self._store.async_load() or {}
+        except Exception as ex:
+            _LOGGER.debug(
+                "Unable to load {}. Error is {}".format(self._store.key, ex)
+            )
+            self._data = {}
+
+    def get_entry(self, vin):
+        return self._data.get(vin)
+
+    def set_entry(self, vin, **data):
+        self._data[vin] = {**data, "updated": dt.utcnow().isoformat()}
+        self._store.async_delay_save(lambda: self._data, STORAGE_SAVE_DELAY)
+
+    def age(self, vin):
+        """Return age of stored entry or None if not stored."""
+        entry = self._data.get(vin)
+        updated = dt.parse_datetime(entry.get("updated", "")) if entry else None
+        if updated:
+            return dt.utcnow() - updated
+        return None
+
+    async def async_remove(self):
+        await self._store.async_remove()
+
+
+class JLRAttributeCache(JLRVehicleStore):
+    """Cache of vehicle attributes.
+
+    Attributes rarely change so are loaded from here on start up and
+    revalidated against the api in the background once older than the ttl.
+    """
+
+    def __init__(self, hass, entry_id):
+        super().__init__(hass, entry_id, "attributes")
+
+    def get(self, vin):
+        """Return cached attributes for vehicle or None."""
+        entry = self.get_entry(vin)
+        if entry:
+            return entry.get("attributes")
+        return None
+
+    def is_stale(self, vin):
+        """Return true if attributes are missing or older than the ttl."""
+        age = self.age(vin)
+        return age is None or age > ATTRIBUTE_CACHE_TTL
+
+    def set(self, vin, attributes):
+        if attributes:
+            self.set_entry(vin, attributes=attributes)
+
+
+class JLRSnapshotStore(JLRVehicleStore):
+    """Last good status, position and trip data for each vehicle.
+
+    Used to restore entities on start up before the first update from the
+    api has completed.
+    """
+
+    def __init__(self, hass, entry_id):
+        super().__init__(hass, entry_id, "snapshot")
+
+    def get(self, vin):
+        """Return snapshot for vehicle or None."""
+        entry = self.get_entry(vin)
+        if entry and entry.get("status"):
+            return entry
+        return None
+
+    def set(self, vehicle):
+        self.set_entry(
+            vehicle.vin,
+            status=vehicle.status.as_dict(),
+            status_ev=vehicle.status_ev.as_dict(),
+            position=vehicle.position,
+            address=vehicle.address,
+            last_trip=vehicle.last_trip,
+        )
+
+
+class JLRTripStore:
+    """Append-only history of trips for each vehicle.
+
+    Trips are appended as json lines to a file in the storage directory
+    and held in memory by vin in start time order. Only the fields used
+    for history and statistics are kept. Trips older than the history
+    kept are dropped on load, when the file is compacted.
+    """
+
+    def __init__(self, hass, entry_id):
+        self.hass = hass
+        self.path = hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.trips")
+        self.trips = {}
+        self._ids = {}
+        self._lock = asyncio.Lock()
+
+    async def async_load(self):
+        try:
+            async with self._lock:
+                self.trips = await self.hass.async_add_executor_job(self._load)
+        except Exception as ex:
+            _LOGGER.debug("Unable to load trips. Error is {}".format(ex))
+            self.trips = {}
+        self._ids = {
+            vin: {record["id"] for record in records}
+            for vin, records in self.trips.items()
+        }
+
+    def _load(self):
+        """Return trips by vin within the history kept.
+
+        The newest trip of each vehicle is always kept so new trips can be
+        found from its id. The file is rewritten if anything was dropped.
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        lines = 0
+        trips = {}
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                lines += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Partly written line from an interrupted append
+                    continue
+                trips.setdefault(record["vin"], {})[record["id"]] = record
+
+        cutoff = dt.utcnow() - timedelta(days=TRIP_HISTORY_DAYS)
+        kept = {}
+        for vin, records in trips.items():
+            records = sorted(
+                records.values(), key=lambda trip: trip["start"] or ""
+            )
+            kept[vin] = [
+                record
+                for record in records[:-1]
+                if self._is_kept(record, cutoff)
+            ]
+            kept[vin].append(records[-1])
+
+        if sum(len(records) for records in kept.values()) < lines:
+            self._compact(kept)
+        return kept
+
+    @staticmethod
+    def _is_kept(record, cutoff):
+        start = dt.parse_datetime(record["start"] or "")
+        return start is not None and dt.as_local(start) > cutoff
+
+    def _compact(self, trips):
+        path = f"{self.path}.tmp"
+        with open(path, "w", encoding="utf-8") as file:
+            for records in trips.values():
+                for record in records:
+                    file.write(
+                        json.dumps(record, separators=(",", ":")) + "\n"
+                    )
+        os.replace(path, self.path)
+
+    def _add(self, record):
+        ids = self._ids.setdefault(record["vin"], set())
+        if record["id"] in ids:
+            return False
+        ids.add(record["id"])
+        self.trips.setdefault(record["vin"], []).append(record)
+        return True
+
+    def get(self, vin):
+        """Return stored trips of a vehicle, oldest first."""
+        return self.trips.get(vin, [])
+
+    def last_trip_id(self, vin):
+        """Return id of the newest stored trip of a vehicle or None."""
+        trips = self.trips.get(vin)
+        return trips[-1]["id"] if trips else None
+
+    async def async_add(self, vin, trips):
+        """Store trips not already stored and return their records."""
+        records = []
+        for trip in trips:
+            details = trip.get("tripDetails") or {}
+            record = {
+                "vin": vin,
+                "id": trip.get("id"),
+                "start": details.get("startTime"),
+                "end": details.get("endTime"),
+                "distance": details.get("distance"),
+                "averageSpeed": details.get("averageSpeed"),
+                "averageFuelConsumption": details.get(
+                    "averageFuelConsumption"
+                ),
+                "averageEnergyConsumption": details.get(
+                    "averageEnergyConsumption"
+                ),
+                "ecoScore": (details.get("totalEcoScore") or {}).get(
+                    "score"
+                ),
+            }
+            if record["id"] is not None and self._add(record):
+                records.append(record)
+        if not records:
+            return records
+
+        stored = self.trips[vin]
+        stored.sort(key=lambda trip: trip["start"] or "")
+
+        lines = "".join(
+            json.dumps(record, separators=(",", ":")) + "\n"
+            for record in records
+        )
+        async with self._lock:
+            await self.hass.async_add_executor_job(self._append, lines)
+        return records
+
+    def _append(self, lines):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    async def async_remove(self):
+        if os.path.exists(self.path):
+            await self.hass.async_add_executor_job(os.remove, self.path)
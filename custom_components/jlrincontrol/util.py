@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from homeassistant.const import TEMP_CELSIUS
 
 
@@ -6,6 +8,12 @@ def field_mask(str_value, from_start=0, from_end=0):
     return f"{str_value[:from_start]}{str_mask}{str_value[-from_end:]}"
 
 
+@lru_cache(maxsize=512)
+def camel_case(key):
+    """Return api status key such as EV_STATE_OF_CHARGE in camel case"""
+    return key[0].lower() + key.title().replace("_", "")[1:]
+
+
 def convert_temp_value(temp_unit, service_code, target_value):
     """Convert from C/F to 31-57 needed for service call"""
 